@@ -0,0 +1 @@
+# Agent worker runtime package
@@ -0,0 +1,53 @@
+"""
+Async facade over the KB service and help request repository for the agent.
+
+The Firestore-backed services are synchronous. Calling them from the agent's
+event loop would stall audio handling for every call on the worker while an
+RPC is in flight, so each call runs on a dedicated bounded thread pool and is
+awaited with a timeout.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.repositories import help_requests_repo
+from app.services import admission, kb_service
+
+
+class AsyncStore:
+    """Awaitable KB / help request operations backed by a bounded executor."""
+
+    def __init__(self, max_workers: int = settings.AGENT_IO_MAX_WORKERS,
+                 timeout: float = settings.AGENT_IO_TIMEOUT_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-io")
+        self._timeout = timeout
+
+    async def _run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(fn, *args))
+        return await asyncio.wait_for(future, timeout or self._timeout)
+
+    async def smart_lookup(self, question: str) -> Dict[str, Any]:
+        return await self._run(kb_service.smart_lookup, question)
+
+    async def create_pending(self, customer_id: str, question: str) -> str:
+        # Rate limited; raises admission.EscalationThrottled when over limit
+        return await self._run(admission.create_pending, customer_id, question)
+
+    async def get_help_request(self, help_request_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(help_requests_repo.get, help_request_id)
+
+    async def get_help_requests(self, help_request_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return await self._run(help_requests_repo.get_many, help_request_ids)
+
+    async def upsert_supervisor_answer(self, question: str, answer: str) -> str:
+        return await self._run(kb_service.upsert_supervisor_answer, question, answer)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+store = AsyncStore()
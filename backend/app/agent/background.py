@@ -0,0 +1,33 @@
+"""
+Fire-and-forget tasks that can't be garbage-collected mid-flight.
+
+The event loop only keeps weak references to tasks, so a task whose result
+nobody holds can be collected before it finishes. `spawn` keeps a strong
+reference until the task is done, and logs failures nobody awaits.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Set
+
+logger = logging.getLogger(__name__)
+
+_tasks: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Awaitable, name: str = "background task") -> asyncio.Task:
+    """Run `coro` as a task on the running loop, held until it finishes."""
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    task.add_done_callback(lambda t: _log_failure(t, name))
+    return task
+
+
+def _log_failure(task: asyncio.Task, name: str):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"{name} failed: {task.exception()!r}")
+
+
+def pending() -> int:
+    return len(_tasks)
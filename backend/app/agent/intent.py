@@ -0,0 +1,51 @@
+"""
+Single-pass transcript pre-classifier.
+
+All greeting, thanks and salon-keyword phrases are compiled into one
+alternation so a transcript is scanned once. Greetings and thanks must match
+whole words ("hi" does not match "this"). Salon keywords match at the start
+of a word, so plurals and compounds still count ("nails", "haircut").
+"""
+
+import re
+from typing import Iterable, NamedTuple
+
+GREETINGS = ("hello", "hi", "hey", "good morning", "good afternoon", "good evening")
+THANKS = ("thank you", "thanks", "thx", "thankyou")
+# Heuristic salon vocabulary used to detect out-of-scope queries.
+SALON_KEYWORDS = (
+    "salon", "hair", "stylist", "appointment", "cut", "colour", "color",
+    "shampoo", "styling", "barber", "nail", "spa", "treatment", "services",
+    "pricing", "price", "hours", "open", "opening", "booking", "blow",
+)
+
+
+class Intent(NamedTuple):
+    greeting: bool
+    thanks: bool
+    salon: bool
+
+
+def _alternation(phrases: Iterable[str]) -> str:
+    # Longest first so "good morning" wins over a shorter overlapping phrase
+    ordered = sorted(set(phrases), key=len, reverse=True)
+    return "|".join(re.escape(p).replace(r"\ ", r"\s+") for p in ordered)
+
+
+_PATTERN = re.compile(
+    rf"\b(?:(?P<greeting>{_alternation(GREETINGS)})\b"
+    rf"|(?P<thanks>{_alternation(THANKS)})\b"
+    rf"|(?P<salon>{_alternation(SALON_KEYWORDS)}))",
+    re.IGNORECASE,
+)
+
+
+def classify(text: str) -> Intent:
+    """Classify a transcript in one scan of the text."""
+    found = set()
+    if text:
+        for m in _PATTERN.finditer(text):
+            found.add(m.lastgroup)
+            if len(found) == 3:
+                break
+    return Intent("greeting" in found, "thanks" in found, "salon" in found)
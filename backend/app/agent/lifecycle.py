@@ -0,0 +1,54 @@
+"""
+Event-driven end-of-call detection.
+
+A call ends when the AgentSession emits `close`, reports an unrecoverable
+`error`, the last remote participant leaves the room, or the job shuts down.
+Each of these resolves a single future that the entrypoint awaits, so an
+idle call has no timers or polling loops.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def session_ended(session: Any, room: Any = None,
+                  add_shutdown_callback: Optional[Callable] = None) -> "asyncio.Future[str]":
+    """Return a future that resolves with the reason the call ended."""
+    ended: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def _end(reason: str):
+        if not ended.done():
+            logger.info(f"Session ended: {reason}")
+            ended.set_result(reason)
+
+    def _on_close(evt=None):
+        reason = getattr(evt, "reason", None)
+        _end(f"session closed ({reason})" if reason else "session closed")
+
+    def _on_error(evt=None):
+        err = getattr(evt, "error", evt)
+        logger.warning(f"Session error: {err}")
+        if getattr(err, "recoverable", True) is False:
+            _end(f"unrecoverable error: {err}")
+
+    session.on("close", _on_close)
+    session.on("error", _on_error)
+
+    if room is not None:
+        def _on_participant_disconnected(participant=None):
+            if not getattr(room, "remote_participants", None):
+                _end("last participant disconnected")
+
+        room.on("participant_disconnected", _on_participant_disconnected)
+        room.on("disconnected", lambda *_: _end("room disconnected"))
+
+    if add_shutdown_callback is not None:
+        async def _on_shutdown(*_):
+            _end("job shutdown")
+
+        add_shutdown_callback(_on_shutdown)
+
+    return ended
@@ -0,0 +1,101 @@
+"""
+Worker-wide batched poller for help request resolutions.
+
+Used when the Firestore watch can't be registered. Instead of one polling
+coroutine per escalation, a single task fetches every outstanding
+help_request_id with one batched `get_all` per tick and dispatches resolved
+documents to their callbacks. The tick interval grows with the number
+outstanding so document reads per second stay near
+POLLING_TARGET_READS_PER_SECOND.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+from app.agent import background
+from app.agent.async_store import store
+
+logger = logging.getLogger(__name__)
+
+ResolutionCallback = Callable[[dict], Awaitable[None]]
+TimeoutCallback = Callable[[], None]
+
+
+class ResolutionPoller:
+    def __init__(self, timeout: float = settings.POLLING_TOTAL_TIMEOUT_SECONDS):
+        self._timeout = timeout
+        self._waiters: Dict[str, Tuple[ResolutionCallback, Optional[TimeoutCallback], float]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, help_request_id: str, callback: ResolutionCallback,
+                 on_timeout: Optional[TimeoutCallback] = None):
+        self._waiters[help_request_id] = (callback, on_timeout, time.monotonic() + self._timeout)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._wakeup.set()
+
+    def unregister(self, help_request_id: str):
+        self._waiters.pop(help_request_id, None)
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+    def interval(self) -> float:
+        """Seconds until the next tick for the current number outstanding."""
+        wanted = len(self._waiters) / settings.POLLING_TARGET_READS_PER_SECOND
+        return min(settings.POLLING_MAX_INTERVAL_SECONDS, max(settings.POLLING_MIN_INTERVAL_SECONDS, wanted))
+
+    async def _run(self):
+        while True:
+            if not self._waiters:
+                # Idle: sleep until something registers
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            await asyncio.sleep(self.interval())
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.warning(f"Resolution poll failed: {e}")
+
+    async def _tick(self):
+        now = time.monotonic()
+        for help_request_id, (_, on_timeout, deadline) in list(self._waiters.items()):
+            if deadline <= now:
+                del self._waiters[help_request_id]
+                logger.info(f"Poll timeout for help_request {help_request_id}")
+                if on_timeout is not None:
+                    on_timeout()
+        if not self._waiters:
+            return
+        docs = await store.get_help_requests(list(self._waiters))
+        for help_request_id, doc in docs.items():
+            if doc.get("status") != "resolved":
+                continue
+            waiter = self._waiters.pop(help_request_id, None)
+            if waiter is not None:
+                background.spawn(waiter[0](doc), name="Resolution callback")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._waiters.clear()
+
+
+_poller: Optional[ResolutionPoller] = None
+
+
+def get_poller() -> ResolutionPoller:
+    global _poller
+    if _poller is None:
+        _poller = ResolutionPoller()
+    return _poller
+
+
+def current() -> Optional[ResolutionPoller]:
+    """Return the poller if one was created."""
+    return _poller
@@ -0,0 +1,103 @@
+"""
+Worker-wide watch for resolved help requests.
+
+Instead of one Firestore listener per escalation, each agent worker process
+keeps a single collection-level watch on help requests resolved after the
+worker started. Escalations register a callback keyed by help_request_id;
+when the watch reports the resolution, the callback runs on the event loop.
+Registering an escalation is a dict insert.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.agent import background
+from app.repositories.firestore_client import get_db
+
+logger = logging.getLogger(__name__)
+
+COLL = "help_requests"
+
+ResolutionCallback = Callable[[dict], Awaitable[None]]
+
+
+class ResolutionWatcher:
+    """Single `resolved_at >= start` watch dispatching to per-request callbacks."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._waiters: Dict[str, ResolutionCallback] = {}
+        self._watch = None
+        # resolved_at is only written on resolution, so a single-field range on
+        # it needs no composite index; status is re-checked on dispatch.
+        self._since = datetime.now(timezone.utc).isoformat()
+
+    @property
+    def running(self) -> bool:
+        return self._watch is not None
+
+    def start(self):
+        """Open the collection watch. Raises if the client doesn't support listeners."""
+        if self._watch is not None:
+            return
+        query = get_db().collection(COLL).where("resolved_at", ">=", self._since)
+        self._watch = query.on_snapshot(self._on_snapshot)
+        logger.info(f"Resolution watcher started (resolved_at >= {self._since})")
+
+    def stop(self):
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception as e:
+                logger.warning(f"Failed to unsubscribe resolution watcher: {e}")
+            self._watch = None
+        self._waiters.clear()
+
+    def register(self, help_request_id: str, callback: ResolutionCallback):
+        self._waiters[help_request_id] = callback
+
+    def unregister(self, help_request_id: str):
+        self._waiters.pop(help_request_id, None)
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        # Runs on the Firestore watch thread: hand the changed documents to the
+        # loop so the waiter dict is only ever touched from one thread.
+        resolved = []
+        for change in changes:
+            if change.type.name == "REMOVED":
+                continue
+            doc = change.document.to_dict()
+            if doc and doc.get("status") == "resolved":
+                resolved.append((change.document.id, doc))
+        if resolved:
+            self._loop.call_soon_threadsafe(self._dispatch, resolved)
+
+    def _dispatch(self, resolved):
+        for help_request_id, doc in resolved:
+            callback = self._waiters.pop(help_request_id, None)
+            if callback is None:
+                continue
+            background.spawn(callback(doc), name="Resolution callback")
+
+
+_watcher: Optional[ResolutionWatcher] = None
+
+
+def get_watcher() -> ResolutionWatcher:
+    """Return this process's watcher, started on the running event loop."""
+    global _watcher
+    if _watcher is None:
+        _watcher = ResolutionWatcher(asyncio.get_running_loop())
+    if not _watcher.running:
+        _watcher.start()
+    return _watcher
+
+
+def current() -> Optional[ResolutionWatcher]:
+    """Return the watcher if one was created, without starting it."""
+    return _watcher
@@ -0,0 +1,101 @@
+"""
+In-memory index of live agent sessions and their open escalations.
+
+Keeps both directions indexed (customer -> help requests, help request ->
+customer/session) so registering, resolving and tearing down a call are all
+O(1) per help request instead of scans over global dicts. Sessions are held
+by weak reference, so a call that ends without cleanup doesn't pin its
+session in memory.
+"""
+
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+def _ref(obj: Any) -> Callable[[], Any]:
+    """Weak reference to `obj`, or a strong one if the type doesn't support it."""
+    try:
+        return weakref.ref(obj)
+    except TypeError:
+        return lambda: obj
+
+
+class SessionRegistry:
+    """Maps customer_id <-> AgentSession and help_request_id <-> waiting customers/sessions.
+
+    A help request can have several waiters when callers asking the same
+    question are coalesced onto it; the first one to escalate is the owner.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, Callable[[], Any]] = {}
+        self._customer_requests: Dict[str, Set[str]] = {}
+        # help_request_id -> {customer_id: session ref or None}, owner first
+        self._request_waiters: Dict[str, Dict[str, Optional[Callable[[], Any]]]] = {}
+
+    def add_session(self, customer_id: str, session: Any):
+        self._sessions[customer_id] = _ref(session)
+
+    def session_for_customer(self, customer_id: Optional[str]) -> Any:
+        ref = self._sessions.get(customer_id) if customer_id else None
+        return ref() if ref is not None else None
+
+    def track(self, help_request_id: str, customer_id: str, session: Any = None):
+        """Record a waiter for an escalation, capturing the session that should hear the answer."""
+        waiters = self._request_waiters.setdefault(help_request_id, {})
+        waiters[customer_id] = _ref(session) if session is not None else None
+        self._customer_requests.setdefault(customer_id, set()).add(help_request_id)
+
+    def is_tracked(self, help_request_id: str) -> bool:
+        return help_request_id in self._request_waiters
+
+    def customer_for(self, help_request_id: str) -> Optional[str]:
+        """Owner of a help request (the caller who escalated first)."""
+        return next(iter(self._request_waiters.get(help_request_id, ())), None)
+
+    def session_for(self, help_request_id: str, customer_id: Optional[str] = None) -> Any:
+        """Session captured at escalation time, else the customer's current session."""
+        customer_id = customer_id or self.customer_for(help_request_id)
+        ref = self._request_waiters.get(help_request_id, {}).get(customer_id)
+        session = ref() if ref is not None else None
+        if session is None:
+            session = self.session_for_customer(customer_id)
+        return session
+
+    def waiters(self, help_request_id: str) -> List[Tuple[str, Any]]:
+        """Every (customer_id, session) waiting on a help request, owner first."""
+        return [(c, self.session_for(help_request_id, c)) for c in self._request_waiters.get(help_request_id, ())]
+
+    def release(self, help_request_id: str):
+        """Forget a single help request (after it resolved or timed out)."""
+        for customer_id in self._request_waiters.pop(help_request_id, ()):
+            requests = self._customer_requests.get(customer_id)
+            if requests is not None:
+                requests.discard(help_request_id)
+                if not requests:
+                    del self._customer_requests[customer_id]
+
+    def teardown(self, customer_id: str) -> List[str]:
+        """Drop a customer's session and escalations.
+
+        Returns the help_request_ids nobody is waiting on any more; requests
+        other callers were coalesced onto stay tracked for them.
+        """
+        self._sessions.pop(customer_id, None)
+        released = []
+        for help_request_id in self._customer_requests.pop(customer_id, ()):
+            waiters = self._request_waiters.get(help_request_id)
+            if waiters is not None:
+                waiters.pop(customer_id, None)
+                if waiters:
+                    continue
+                del self._request_waiters[help_request_id]
+            released.append(help_request_id)
+        return released
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "open_help_requests": len(self._request_waiters),
+            "waiters": sum(len(w) for w in self._request_waiters.values()),
+        }
@@ -0,0 +1,79 @@
+"""
+Speculative KB lookups on interim transcripts.
+
+While the caller is still speaking, STT emits interim transcripts. Once the
+same interim text has been seen twice in a row (a stable prefix), a
+cancellable KB lookup starts for it. When the final transcript arrives, a
+lookup for the same normalized text is reused, whether it is still in flight
+or already done. Anything else is cancelled and counted as waste.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.services.kb_service import normalize
+
+# Worker-wide counters: started / hit / miss / wasted
+stats: Counter = Counter()
+
+
+class SpeculativeLookup:
+    """Per-session speculative lookup tracker."""
+
+    def __init__(self, lookup: Callable[[str], Awaitable[Dict[str, Any]]]):
+        self._lookup = lookup
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._last_interim: Optional[str] = None
+
+    def on_interim(self, text: str):
+        """Start a lookup once an interim transcript repeats unchanged."""
+        key = normalize(text) if text else ""
+        if not key:
+            return
+        stable = key == self._last_interim
+        self._last_interim = key
+        if not stable or key in self._tasks:
+            return
+        # Drop speculations the caller has already talked past
+        for other in [k for k in self._tasks if not key.startswith(k)]:
+            self._discard(other)
+        task = asyncio.get_running_loop().create_task(self._lookup(text))
+        task.add_done_callback(_consume_exception)
+        self._tasks[key] = task
+        stats["started"] += 1
+
+    async def resolve(self, text: str) -> Dict[str, Any]:
+        """Lookup result for a final transcript, reusing a matching speculation."""
+        key = normalize(text)
+        task = self._tasks.pop(key, None)
+        self.reset()
+        if task is not None:
+            try:
+                result = await task
+                stats["hit"] += 1
+                return result
+            except Exception:
+                # Failed speculation: fall through to a fresh lookup
+                stats["wasted"] += 1
+        stats["miss"] += 1
+        return await self._lookup(text)
+
+    def reset(self):
+        """Cancel all outstanding speculations (turn finished or session closed)."""
+        for key in list(self._tasks):
+            self._discard(key)
+        self._last_interim = None
+
+    def _discard(self, key: str):
+        task = self._tasks.pop(key)
+        if not task.done():
+            task.cancel()
+        stats["wasted"] += 1
+
+
+def _consume_exception(task: asyncio.Task):
+    # A discarded speculation is never awaited; read its exception so a
+    # failed lookup doesn't log "Task exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
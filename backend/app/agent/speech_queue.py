@@ -0,0 +1,231 @@
+"""
+Ordered per-session speech queue.
+
+Everything the agent says to a caller (greeting, turn replies, supervisor
+follow-ups) goes through one queue per session, spoken by a single worker
+task, so utterances never overlap or interleave. Follow-ups take priority
+over replies. Adjacent messages of the same priority and the same turn token
+that haven't started yet are merged into one utterance (up to
+SPEECH_MERGE_MAX_CHARS); replies to different turns are never joined, and
+`cancel(token)` drops a superseded turn's unspoken reply. Depth is bounded:
+when full, the oldest pending reply is dropped; follow-ups (a supervisor's
+answer) are never dropped, so if only follow-ups are pending a new reply is
+rejected instead and a new follow-up is queued past the limit.
+
+Queue depth and wait time are kept in worker-wide metrics. Agent workers are
+separate processes from the API, so each worker publishes its counters to a
+small JSON file under SPEECH_METRICS_DIR (at most every few seconds) and the
+API's /admin/stats sums them with `worker_metrics()`.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+import weakref
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+
+from app.config import settings
+
+FOLLOWUP = 0
+REPLY = 1
+
+# Worker-wide counters (enqueued, merged, dropped, rejected, cancelled, spoken, failed, wait_ms_total, max_depth)
+metrics: Counter = Counter()
+# Seconds between metric file writes, and how long a silent worker's file still counts
+_PUBLISH_INTERVAL = 5.0
+_STALE_AFTER = 600.0
+_published_at = 0.0
+
+_queues: "weakref.WeakKeyDictionary[Any, SpeechQueue]" = weakref.WeakKeyDictionary()
+
+
+def queue_for(session: Any) -> Optional["SpeechQueue"]:
+    """Return the open speech queue for `session`, if any."""
+    try:
+        return _queues.get(session)
+    except TypeError:
+        return None
+
+
+class _Utterance:
+    __slots__ = ("parts", "length", "enqueued_at", "done", "token")
+
+    def __init__(self, text: str, loop: asyncio.AbstractEventLoop, token: Optional[Hashable] = None):
+        self.token = token
+        self.parts: List[str] = [text]
+        self.length = len(text)
+        self.enqueued_at = time.monotonic()
+        self.done: asyncio.Future = loop.create_future()
+
+    def resolve(self, ok: bool):
+        if not self.done.done():
+            self.done.set_result(ok)
+
+
+class SpeechQueue:
+    def __init__(self, session: Any, speak: Callable[[str], Awaitable[bool]],
+                 max_depth: int = settings.SPEECH_QUEUE_MAX_DEPTH,
+                 merge_max_chars: int = settings.SPEECH_MERGE_MAX_CHARS):
+        self._speak = speak
+        self._max_depth = max_depth
+        self._merge_max_chars = merge_max_chars
+        self._loop = asyncio.get_running_loop()
+        self._pending: Dict[int, Deque[_Utterance]] = {FOLLOWUP: deque(), REPLY: deque()}
+        self._ready = asyncio.Event()
+        self._worker = self._loop.create_task(self._run())
+        self._session = None
+        try:
+            _queues[session] = self
+            self._session = weakref.ref(session)
+        except TypeError:
+            pass
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._pending.values())
+
+    def say(self, text: str, priority: int = REPLY, token: Optional[Hashable] = None) -> asyncio.Future:
+        """Queue `text`; the returned future resolves to True once it was spoken.
+
+        `token` tags the utterance (e.g. with the turn it answers) so it can be
+        dropped with `cancel()`; only utterances with the same token are merged.
+        """
+        pending = self._pending[priority]
+        metrics["enqueued"] += 1
+        if (pending and pending[-1].token == token
+                and pending[-1].length + len(text) < self._merge_max_chars):
+            # Merge into the not-yet-started utterance of the same priority and turn
+            pending[-1].parts.append(text)
+            pending[-1].length += len(text) + 1
+            metrics["merged"] += 1
+            return pending[-1].done
+        if len(self) >= self._max_depth and not self._make_room(priority):
+            # Only follow-ups are pending and those are never dropped
+            metrics["rejected"] += 1
+            rejected = self._loop.create_future()
+            rejected.set_result(False)
+            return rejected
+        utterance = _Utterance(text, self._loop, token)
+        pending.append(utterance)
+        metrics["max_depth"] = max(metrics["max_depth"], len(self))
+        self._ready.set()
+        return utterance.done
+
+    def cancel(self, token: Hashable) -> int:
+        """Drop every not-yet-started utterance tagged with `token`; returns how many."""
+        dropped = 0
+        for priority, pending in self._pending.items():
+            keep = deque()
+            for utterance in pending:
+                if utterance.token == token:
+                    utterance.resolve(False)
+                    dropped += 1
+                else:
+                    keep.append(utterance)
+            self._pending[priority] = keep
+        metrics["cancelled"] += dropped
+        return dropped
+
+    def _make_room(self, priority: int) -> bool:
+        """Drop the oldest pending reply; False if `priority` can't be queued."""
+        if self._pending[REPLY]:
+            self._pending[REPLY].popleft().resolve(False)
+            metrics["dropped"] += 1
+            return True
+        return priority == FOLLOWUP
+
+    def _next(self) -> Optional[_Utterance]:
+        for priority in (FOLLOWUP, REPLY):
+            if self._pending[priority]:
+                return self._pending[priority].popleft()
+        return None
+
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            utterance = self._next()
+            if utterance is None:
+                self._ready.clear()
+                continue
+            metrics["wait_ms_total"] += int((time.monotonic() - utterance.enqueued_at) * 1000)
+            try:
+                ok = await self._speak(" ".join(utterance.parts))
+            except asyncio.CancelledError:
+                utterance.resolve(False)
+                raise
+            except Exception:
+                ok = False
+            metrics["spoken" if ok else "failed"] += 1
+            utterance.resolve(ok)
+            publish_metrics()
+
+    async def close(self):
+        """Stop the worker and fail everything still pending."""
+        self._worker.cancel()
+        await asyncio.wait([self._worker])
+        for pending in self._pending.values():
+            while pending:
+                pending.popleft().resolve(False)
+        session = self._session() if self._session is not None else None
+        if session is not None:
+            _queues.pop(session, None)
+
+
+def _with_average(counts: Dict[str, float]) -> Dict[str, float]:
+    snap = dict(counts)
+    spoken = counts.get("spoken", 0) + counts.get("failed", 0)
+    snap["avg_wait_ms"] = round(counts.get("wait_ms_total", 0) / spoken, 1) if spoken else 0.0
+    return snap
+
+
+def metrics_snapshot() -> Dict[str, float]:
+    return _with_average(metrics)
+
+
+def publish_metrics(force: bool = False):
+    """Write this worker's counters for the API's /admin/stats (throttled unless `force`)."""
+    global _published_at
+    directory = settings.SPEECH_METRICS_DIR
+    now = time.monotonic()
+    if not directory or (not force and now - _published_at < _PUBLISH_INTERVAL):
+        return
+    _published_at = now
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(dict(metrics), f)
+        os.replace(tmp, os.path.join(directory, f"speech-{os.getpid()}.json"))
+    except OSError:
+        pass
+
+
+def worker_metrics() -> Dict[str, float]:
+    """Counters summed over every agent worker that published recently."""
+    directory = settings.SPEECH_METRICS_DIR
+    totals: Counter = Counter()
+    workers = 0
+    try:
+        names = os.listdir(directory) if directory else []
+    except OSError:
+        names = []
+    for name in names:
+        if not (name.startswith("speech-") and name.endswith(".json")):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if time.time() - os.path.getmtime(path) > _STALE_AFTER:
+                continue
+            with open(path) as f:
+                counts = json.load(f)
+        except (OSError, ValueError):
+            continue
+        workers += 1
+        for key, value in counts.items():
+            if key == "max_depth":
+                totals[key] = max(totals[key], value)
+            else:
+                totals[key] += value
+    return {"workers": workers, **_with_average(totals)}
@@ -0,0 +1,160 @@
+"""
+Content-addressed disk cache of synthesized speech.
+
+Fixed prompts (greeting, hold message, out-of-scope reply) and frequently
+spoken KB answers are synthesized once and stored as raw PCM files keyed by
+sha256(voice, model, text). Playback memory-maps the file and yields 20 ms
+audio frames, so repeated output costs no TTS latency or spend. The directory
+is bounded by TTS_CACHE_MAX_MB with least-recently-played eviction.
+"""
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import struct
+from collections import Counter
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Optional
+
+from app.agent import background
+from app.config import settings
+
+if TYPE_CHECKING:
+    from livekit import rtc
+
+logger = logging.getLogger(__name__)
+
+# File header: sample_rate (u32), num_channels (u16), reserved (u16); PCM int16 follows
+_HEADER = struct.Struct("<IHH")
+_FRAME_MS = 20
+
+
+class TTSAudioCache:
+    def __init__(self, directory: str = settings.TTS_CACHE_DIR,
+                 max_bytes: int = settings.TTS_CACHE_MAX_MB * 1024 * 1024,
+                 min_hits: int = settings.TTS_CACHE_MIN_HITS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_hits = min_hits
+        self._tts = None
+        self._voice = "default"
+        self._model = "default"
+        self._hits: Counter = Counter()
+        self._inflight: set = set()
+
+    def attach(self, tts):
+        """Bind the TTS used to populate the cache; voice/model become part of the key."""
+        self._tts = tts
+        opts = getattr(tts, "_opts", None)
+        self._voice = str(getattr(opts, "voice", None) or getattr(tts, "voice", None) or "default")
+        self._model = str(getattr(opts, "model", None) or getattr(tts, "model", None) or "default")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, text: str) -> str:
+        digest = hashlib.sha256(f"{self._voice}\0{self._model}\0{text}".encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pcm")
+
+    def has(self, text: str) -> bool:
+        return os.path.exists(self._path(text))
+
+    def frames(self, text: str) -> Optional[AsyncIterator["rtc.AudioFrame"]]:
+        """Return an async iterator of cached frames for `text`, or None on a miss."""
+        path = self._path(text)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # mark as recently played for eviction
+        except OSError:
+            pass
+        return self._play(f)
+
+    async def _play(self, f):
+        from livekit import rtc
+
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            sample_rate, num_channels, _ = _HEADER.unpack_from(mm, 0)
+            samples = sample_rate * _FRAME_MS // 1000
+            step = samples * num_channels * 2
+            for offset in range(_HEADER.size, len(mm), step):
+                # Slicing copies one 20 ms chunk out of the shared page cache,
+                # so no frame keeps the mapping alive after playback.
+                chunk = mm[offset:offset + step]
+                yield rtc.AudioFrame(
+                    data=chunk,
+                    sample_rate=sample_rate,
+                    num_channels=num_channels,
+                    samples_per_channel=len(chunk) // (2 * num_channels),
+                )
+
+    def note_use(self, text: str):
+        """Count a spoken KB answer; populate the cache once it is used often enough."""
+        if not text:
+            return
+        self._hits[text] += 1
+        if self._hits[text] >= self.min_hits:
+            self.schedule(text)
+
+    def warm(self, texts: Iterable[str]):
+        """Ensure fixed prompts are cached regardless of hit counts."""
+        for text in texts:
+            self.schedule(text)
+
+    def schedule(self, text: str):
+        if self._tts is None or text in self._inflight or self.has(text):
+            return
+        self._inflight.add(text)
+        background.spawn(self._populate(text), name="TTS cache populate")
+
+    async def _populate(self, text: str):
+        path = self._path(text)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            header = None
+            with open(tmp, "wb") as out:
+                async with self._tts.synthesize(text) as stream:
+                    async for ev in stream:
+                        frame = ev.frame
+                        if header is None:
+                            header = _HEADER.pack(frame.sample_rate, frame.num_channels, 0)
+                            out.write(header)
+                        out.write(bytes(frame.data))
+            if header is None:
+                os.remove(tmp)
+                return
+            os.replace(tmp, path)
+            self._hits.pop(text, None)
+            await asyncio.to_thread(self._evict)
+        except Exception as e:
+            logger.warning(f"TTS cache population failed: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        finally:
+            self._inflight.discard(text)
+
+    def _evict(self):
+        """Remove least recently played files until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".pcm"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+audio_cache = TTSAudioCache()
@@ -0,0 +1,75 @@
+"""
+Per-session turn manager for final transcripts.
+
+The same utterance can reach the agent more than once (the session is
+subscribed under two event names, and STT can repeat a final). Each final
+transcript is deduplicated by normalized text within a short time window.
+Turns are serialized: a new turn cancels the previous one if it is still
+running, then waits for it to unwind before starting, so one utterance never
+produces two lookups, escalations or spoken replies. Each turn gets an id
+that its reply is tagged with; when a newer turn starts, `on_superseded` is
+called with the previous turn's id so a reply that was queued but not yet
+spoken can be dropped too.
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+from app.services.kb_service import normalize
+
+TurnHandler = Callable[[str, int], Awaitable[None]]
+
+
+class TurnManager:
+    def __init__(self, handler: TurnHandler, window: float = settings.TRANSCRIPT_DEDUPE_WINDOW_SECONDS,
+                 on_superseded: Optional[Callable[[int], None]] = None):
+        self._handler = handler
+        self._window = window
+        self._on_superseded = on_superseded
+        self._recent: Dict[str, float] = {}
+        self._current: Optional[asyncio.Task] = None
+        self._turn_id = 0
+        self.stats: Counter = Counter()
+
+    def _is_duplicate(self, key: str, timestamp: float) -> bool:
+        # Prune expired keys so the map stays as small as the window
+        for k in [k for k, ts in self._recent.items() if timestamp - ts > self._window]:
+            del self._recent[k]
+        seen = self._recent.get(key)
+        self._recent[key] = timestamp
+        return seen is not None and abs(timestamp - seen) <= self._window
+
+    def submit(self, text: str, timestamp: Optional[float] = None) -> Optional[asyncio.Task]:
+        """Start a turn for a final transcript; returns None if it was a duplicate."""
+        key = normalize(text)
+        if not key or self._is_duplicate(key, timestamp if timestamp is not None else time.time()):
+            self.stats["duplicates"] += 1
+            return None
+        prev = self._current
+        if prev is not None and not prev.done():
+            prev.cancel()
+            self.stats["cancelled"] += 1
+        if prev is not None and self._on_superseded is not None:
+            # Drop the previous turn's reply if it is still waiting to be spoken
+            self._on_superseded(self._turn_id)
+        self._turn_id += 1
+        self.stats["turns"] += 1
+        self._current = asyncio.get_running_loop().create_task(self._run(prev, text, self._turn_id))
+        return self._current
+
+    async def _run(self, prev: Optional[asyncio.Task], text: str, turn_id: int):
+        if prev is not None:
+            # asyncio.wait doesn't re-raise prev's CancelledError, but still
+            # propagates our own cancellation
+            await asyncio.wait([prev])
+        await self._handler(text, turn_id)
+
+    async def close(self):
+        """Cancel any in-flight turn and wait for it to finish."""
+        task, self._current = self._current, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.wait([task])
@@ -21,6 +21,15 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# backend/ directory; relative paths that several processes must agree on
+# (API and agent may be started from different working directories) resolve here
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _backend_path(value: str) -> str:
+    """Anchor a relative path to BACKEND_DIR; empty stays empty (disabled)."""
+    return os.path.join(BACKEND_DIR, value) if value else ""
+
 
 class Settings(BaseModel):
     """
@@ -40,12 +49,20 @@ class Settings(BaseModel):
     )
     FIRESTORE_DATABASE: str = os.getenv("FIRESTORE_DATABASE", "(default)")
     FIRESTORE_EMULATOR_HOST: str | None = os.getenv("FIRESTORE_EMULATOR_HOST")
+    # Client pool size (one gRPC channel each), startup warmup timeout, and how
+    # long /admin/db/reconnect lets in-flight calls finish on the old clients
+    FIRESTORE_CHANNELS: int = int(os.getenv("FIRESTORE_CHANNELS", "1"))
+    FIRESTORE_WARMUP_TIMEOUT_SECONDS: float = float(os.getenv("FIRESTORE_WARMUP_TIMEOUT_SECONDS", "5"))
+    FIRESTORE_DRAIN_SECONDS: float = float(os.getenv("FIRESTORE_DRAIN_SECONDS", "10"))
 
     # LiveKit voice integration settings
     LIVEKIT_URL: str = os.getenv("LIVEKIT_URL", "")
     LIVEKIT_API_KEY: str = os.getenv("LIVEKIT_API_KEY", "")
     LIVEKIT_API_SECRET: str = os.getenv("LIVEKIT_API_SECRET", "")
     LIVEKIT_DEFAULT_ROOM: str = os.getenv("LIVEKIT_DEFAULT_ROOM", "frontdesk-demo")
+    # Bulk token issuance: default token lifetime and max tokens per request
+    LIVEKIT_TOKEN_TTL_SECONDS: int = int(os.getenv("LIVEKIT_TOKEN_TTL_SECONDS", "21600"))
+    LIVEKIT_TOKEN_MAX_BATCH: int = int(os.getenv("LIVEKIT_TOKEN_MAX_BATCH", "1000"))
 
     # Help request timeout and escalation settings
     HELP_REQUEST_TIMEOUT_MIN: int = int(os.getenv("HELP_REQUEST_TIMEOUT_MIN", "5"))
@@ -57,10 +74,65 @@ class Settings(BaseModel):
     # Performance optimization and caching settings
     KB_CACHE_TTL_SECONDS: int = int(os.getenv("KB_CACHE_TTL_SECONDS", "300"))  # 5 minutes
     KB_CACHE_MAX_SIZE: int = int(os.getenv("KB_CACHE_MAX_SIZE", "1000"))
+    # Stale-while-revalidate: serve expired entries this long past TTL while
+    # refreshing them, and proactively refresh the hottest keys near expiry
+    KB_CACHE_STALE_SECONDS: int = int(os.getenv("KB_CACHE_STALE_SECONDS", "600"))
+    KB_CACHE_HOT_KEYS: int = int(os.getenv("KB_CACHE_HOT_KEYS", "50"))
+    KB_CACHE_REFRESH_AHEAD_RATIO: float = float(os.getenv("KB_CACHE_REFRESH_AHEAD_RATIO", "0.8"))
+    KB_CACHE_REFRESH_INTERVAL_SECONDS: float = float(os.getenv("KB_CACHE_REFRESH_INTERVAL_SECONDS", "30"))
+    # Optional host-wide L2 KB cache (SQLite WAL file shared by local processes)
+    KB_L2_CACHE_PATH: str = os.getenv("KB_L2_CACHE_PATH", "")
+    # TTL used while the cross-process invalidation feed is live
+    KB_CACHE_TTL_WITH_INVALIDATION_SECONDS: int = int(os.getenv("KB_CACHE_TTL_WITH_INVALIDATION_SECONDS", "3600"))
     ENABLE_PERFORMANCE_MONITORING: bool = os.getenv("ENABLE_PERFORMANCE_MONITORING", "true").lower() == "true"
+    # Log per-module import time and startup phase timings (read before settings load)
+    STARTUP_PROFILE: bool = os.getenv("STARTUP_PROFILE", "false").lower() == "true"
     
     # Polling and timeout configuration for real-time updates
     MAX_POLLING_ATTEMPTS: int = int(os.getenv("MAX_POLLING_ATTEMPTS", "7"))
     POLLING_TOTAL_TIMEOUT_SECONDS: int = int(os.getenv("POLLING_TOTAL_TIMEOUT_SECONDS", "120"))
+    # Agent worker batched poller: tick bounds and target document reads/second
+    POLLING_MIN_INTERVAL_SECONDS: float = float(os.getenv("POLLING_MIN_INTERVAL_SECONDS", "2"))
+    POLLING_MAX_INTERVAL_SECONDS: float = float(os.getenv("POLLING_MAX_INTERVAL_SECONDS", "30"))
+    POLLING_TARGET_READS_PER_SECOND: float = float(os.getenv("POLLING_TARGET_READS_PER_SECOND", "50"))
+
+    # Escalation admission control (token buckets per customer and per process)
+    ESCALATION_RATE_PER_CUSTOMER_PER_MINUTE: float = float(os.getenv("ESCALATION_RATE_PER_CUSTOMER_PER_MINUTE", "2"))
+    ESCALATION_BURST_PER_CUSTOMER: int = int(os.getenv("ESCALATION_BURST_PER_CUSTOMER", "3"))
+    ESCALATION_GLOBAL_RATE_PER_SECOND: float = float(os.getenv("ESCALATION_GLOBAL_RATE_PER_SECOND", "10"))
+    ESCALATION_GLOBAL_BURST: int = int(os.getenv("ESCALATION_GLOBAL_BURST", "50"))
+
+    # Agent worker I/O: bounded executor for blocking KB/Firestore calls
+    AGENT_IO_MAX_WORKERS: int = int(os.getenv("AGENT_IO_MAX_WORKERS", "8"))
+    AGENT_IO_TIMEOUT_SECONDS: float = float(os.getenv("AGENT_IO_TIMEOUT_SECONDS", "5"))
+
+    # Agent turn handling: identical final transcripts within this window are one turn
+    TRANSCRIPT_DEDUPE_WINDOW_SECONDS: float = float(os.getenv("TRANSCRIPT_DEDUPE_WINDOW_SECONDS", "2"))
+
+    # Agent speech queue: pending utterances per session and merge size limit
+    SPEECH_QUEUE_MAX_DEPTH: int = int(os.getenv("SPEECH_QUEUE_MAX_DEPTH", "4"))
+    SPEECH_MERGE_MAX_CHARS: int = int(os.getenv("SPEECH_MERGE_MAX_CHARS", "400"))
+    # Where agent workers publish speech queue metrics for /admin/stats (empty disables)
+    SPEECH_METRICS_DIR: str = _backend_path(os.getenv("SPEECH_METRICS_DIR", ".agent_metrics"))
+
+    # Agent TTS audio cache (fixed prompts and frequent KB answers)
+    TTS_CACHE_DIR: str = os.getenv("TTS_CACHE_DIR", ".tts_cache")
+    TTS_CACHE_MAX_MB: int = int(os.getenv("TTS_CACHE_MAX_MB", "200"))
+    TTS_CACHE_MIN_HITS: int = int(os.getenv("TTS_CACHE_MIN_HITS", "3"))
+
+    # Shared mmap-able KB snapshot (empty path disables) and export debounce
+    # (relative paths resolve against backend/, so the API and agent share one file)
+    KB_SNAPSHOT_PATH: str = _backend_path(os.getenv("KB_SNAPSHOT_PATH", ".kb_snapshot/kb.snap"))
+    KB_SNAPSHOT_EXPORT_DELAY_SECONDS: float = float(os.getenv("KB_SNAPSHOT_EXPORT_DELAY_SECONDS", "1"))
+    # Snapshot hits can lag a write, so they're cached this long, not the full TTL
+    KB_SNAPSHOT_HIT_TTL_SECONDS: float = float(os.getenv("KB_SNAPSHOT_HIT_TTL_SECONDS", "30"))
+
+    # Conditional GET: how long a list ETag is trusted before re-probing Firestore,
+    # without and with a live change watch on the collection
+    ETAG_PROBE_TTL_SECONDS: float = float(os.getenv("ETAG_PROBE_TTL_SECONDS", "2"))
+    ETAG_WATCHED_PROBE_TTL_SECONDS: float = float(os.getenv("ETAG_WATCHED_PROBE_TTL_SECONDS", "300"))
+
+    # Bulk export settings (documents fetched per Firestore page)
+    EXPORT_PAGE_SIZE: int = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
 
 settings = Settings()
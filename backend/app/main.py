@@ -13,6 +13,10 @@ The application handles:
 - Background task scheduling and timeout management
 """
 
+# Install the import timer before anything heavy is imported (STARTUP_PROFILE=true)
+from app.utils import startup_profile
+startup_profile.install()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -25,7 +29,12 @@ from app.routers.admin import router as admin_router
 from app.routers.kb import router as kb_router
 from app.routers.agent import router as agent_router
 from app.routers.livekit import router as livekit_router
+from app.routers.export import router as export_router
 from app.services.kb_service import load_index_from_kb
+from app.services import kb_snapshot, kb_invalidation, kb_service
+from app.repositories import help_requests_repo
+from app.utils import etag
+from app.repositories.firestore_client import warm_up as warm_up_db
 from app.workers import start as scheduler_start, stop as scheduler_stop
 
 # Initialize FastAPI application with metadata
@@ -39,25 +48,49 @@ async def lifespan(app: FastAPI):
     
     Handles:
     - Logging configuration initialization
+    - Firestore channel warmup
     - Knowledge base index loading
     - Background task scheduler startup
     - Graceful shutdown of background tasks
     """
     # Application startup sequence
-    configure_logging()
-    try:
-        load_index_from_kb()
-    except Exception as e:
-        import logging
-        logging.getLogger("startup").warning(f"KB index load skipped/failed: {e}")
+    with startup_profile.phase("lifespan.configure_logging"):
+        configure_logging()
+    # Open the Firestore channel(s) now so the first request doesn't pay for it
+    with startup_profile.phase("lifespan.firestore_warmup"):
+        try:
+            warm_up_db()
+        except Exception as e:
+            import logging
+            logging.getLogger("startup").warning(f"Firestore warmup skipped/failed: {e}")
+    with startup_profile.phase("lifespan.load_kb_index"):
+        try:
+            load_index_from_kb()
+        except Exception as e:
+            import logging
+            logging.getLogger("startup").warning(f"KB index load skipped/failed: {e}")
+    # Keep this process's KB cache in sync with writes made by other processes
+    with startup_profile.phase("lifespan.kb_invalidation"):
+        kb_invalidation.start()
+    # List ETags change on any process's writes without re-probing Firestore
+    with startup_profile.phase("lifespan.etag_watches"):
+        etag.watch((help_requests_repo.COLL, kb_service.COLL))
+    # One API process per host exports the shared KB snapshot for agent workers
+    with startup_profile.phase("lifespan.schedule_kb_snapshot"):
+        if kb_snapshot.claim_exporter():
+            kb_snapshot.schedule_export(delay=0)
     
     # Start background task scheduler for timeout management
-    scheduler_start()
+    with startup_profile.phase("lifespan.scheduler_start"):
+        scheduler_start()
+    startup_profile.report()
     
     yield
     
     # Application shutdown sequence
     scheduler_stop()
+    kb_invalidation.stop()
+    etag.stop_watches()
 
 app.router.lifespan_context = lifespan
 
@@ -101,3 +134,4 @@ app.include_router(admin_router)          # Administrative operations
 app.include_router(kb_router)             # Knowledge base operations
 app.include_router(agent_router)          # AI agent interactions
 app.include_router(livekit_router)        # LiveKit voice integration
+app.include_router(export_router)         # Bulk NDJSON exports
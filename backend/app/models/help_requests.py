@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field
+from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
 
 class CreateHelpRequest(BaseModel):
     customer_id: str = Field(..., min_length=1)
@@ -14,4 +15,37 @@ class HelpRequestOut(BaseModel):
 
 class ResolveHelpRequest(BaseModel):
     answer: str = Field(..., min_length=1)
-    resolver: str = Field(..., min_length=1)
\ No newline at end of file
+    resolver: str = Field(..., min_length=1)
+
+# Fields a list caller may project with `?fields=`. `id` and `created_at` are
+# always fetched because the pagination cursor is built from them.
+HELP_REQUEST_FIELDS = frozenset({
+    "id", "customer_id", "question", "status", "created_at", "updated_at",
+    "resolved_at", "resolver", "supervisor_answer", "ai_followup_sent",
+    "seen_by_supervisor", "auto_resolved_from",
+})
+
+class HelpRequestItem(BaseModel):
+    """List item; every field but `id` is optional so projected documents validate."""
+    id: str
+    customer_id: str | None = None
+    question: str | None = None
+    status: str | None = None
+    created_at: str | None = None
+    updated_at: str | None = None
+    resolved_at: str | None = None
+    resolver: str | None = None
+    supervisor_answer: str | None = None
+    ai_followup_sent: bool | None = None
+    seen_by_supervisor: bool | None = None
+    auto_resolved_from: str | None = None
+
+    @field_validator("created_at", "updated_at", "resolved_at", mode="before")
+    @classmethod
+    def _timestamp_to_iso(cls, value):
+        # Documents written as Firestore timestamps come back as datetimes
+        return value.isoformat() if isinstance(value, datetime) else value
+
+class HelpRequestPage(BaseModel):
+    items: list[HelpRequestItem]
+    next_cursor: str | None = None
@@ -1,31 +1,136 @@
-from google.cloud import firestore
 from app.config import settings
+import itertools
+import logging
 import threading
+import time
 from functools import lru_cache
+from typing import Any, Dict, List
 
-_client = None
+logger = logging.getLogger(__name__)
+
+# Firestore caps write batches at 500 operations
+BATCH_LIMIT = 500
+
+# Pool of clients, one gRPC channel each (FIRESTORE_CHANNELS, usually 1)
+_clients: List[Any] = []
 _client_lock = threading.Lock()
+_round_robin = itertools.count()
 
-def get_db():
-    global _client
-    if _client is None:
+def _new_client():
+    # Imported here so processes that never touch the DB skip it; the
+    # emulator is picked up from FIRESTORE_EMULATOR_HOST by the SDK itself
+    from google.cloud import firestore
+    return firestore.Client(
+        project=settings.FIRESTORE_PROJECT_ID,
+        database=settings.FIRESTORE_DATABASE
+    )
+
+def _new_pool() -> List[Any]:
+    return [_new_client() for _ in range(max(1, settings.FIRESTORE_CHANNELS))]
+
+def _pool() -> List[Any]:
+    global _clients
+    if not _clients:
         with _client_lock:
-            if _client is None:  # Double-check locking pattern
-                if settings.FIRESTORE_EMULATOR_HOST:
-                    _client = firestore.Client(
-                        project=settings.FIRESTORE_PROJECT_ID,
-                        database=settings.FIRESTORE_DATABASE
-                    )
-                else:
-                    _client = firestore.Client(
-                        project=settings.FIRESTORE_PROJECT_ID,
-                        database=settings.FIRESTORE_DATABASE
-                    )
-    return _client
+            if not _clients:  # Double-check locking pattern
+                _clients = _new_pool()
+    return _clients
+
+def get_db():
+    """Return a Firestore client, spreading callers across the channel pool."""
+    clients = _pool()
+    if len(clients) == 1:
+        return clients[0]
+    return clients[next(_round_robin) % len(clients)]
+
+def _ping_client(client, timeout: float) -> float:
+    """One cheap read (a missing document); returns the round trip in ms."""
+    t0 = time.perf_counter()
+    client.collection("_health").document("ping").get(timeout=timeout)
+    return (time.perf_counter() - t0) * 1000
+
+def warm_up(timeout: float = None) -> List[float]:
+    """
+    Open every channel and fetch auth tokens up front with a cheap read, so
+    the first real request doesn't pay for connection setup.
+    """
+    timeout = timeout or settings.FIRESTORE_WARMUP_TIMEOUT_SECONDS
+    latencies = [_ping_client(client, timeout) for client in _pool()]
+    logger.info(f"Firestore warmed up: {len(latencies)} channel(s), {[round(ms, 1) for ms in latencies]} ms")
+    return latencies
+
+def ping(timeout: float = 2.0) -> Dict[str, Any]:
+    """Round-trip latency per channel, for deep health checks."""
+    try:
+        latencies = [round(_ping_client(client, timeout), 1) for client in _pool()]
+        return {"ok": True, "channels": len(latencies), "latency_ms": latencies}
+    except Exception as e:
+        return {"ok": False, "channels": len(_clients), "error": str(e)}
+
+def reconnect(drain_seconds: float = None) -> Dict[str, Any]:
+    """
+    Replace the client pool without failing in-flight calls.
+
+    A new pool is built and warmed first, then swapped in so new callers get
+    it; the old clients are closed only after `drain_seconds`, giving calls
+    already running on them time to finish.
+    """
+    global _clients
+    drain_seconds = settings.FIRESTORE_DRAIN_SECONDS if drain_seconds is None else drain_seconds
+    new_clients = _new_pool()
+    for client in new_clients:
+        try:
+            _ping_client(client, settings.FIRESTORE_WARMUP_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning(f"Firestore warmup after reconnect failed: {e}")
+    with _client_lock:
+        old_clients, _clients = _clients, new_clients
+
+    def _close_old():
+        for client in old_clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning(f"Error closing drained Firestore client: {e}")
+
+    if old_clients:
+        timer = threading.Timer(drain_seconds, _close_old)
+        timer.daemon = True
+        timer.start()
+    return {"channels": len(new_clients), "draining": len(old_clients), "drain_seconds": drain_seconds}
 
 def close_db():
     """Close database connection (for testing/cleanup)"""
-    global _client
-    if _client is not None:
-        _client.close()
-        _client = None
+    global _clients
+    with _client_lock:
+        clients, _clients = _clients, []
+    for client in clients:
+        client.close()
+
+def collection_stamp(name: str) -> str:
+    """Cheap change stamp for a collection: document count + newest updated_at."""
+    col = get_db().collection(name)
+    count = col.count().get()[0][0].value
+    latest = ""
+    for snap in col.order_by("updated_at", direction="DESCENDING").select(["updated_at"]).limit(1).stream():
+        latest = snap.to_dict().get("updated_at", "")
+    return f"{count}:{latest}"
+
+def stream_paged(query, page_size: int):
+    """
+    Yield document dicts from an ordered query, one `page_size` page per RPC.
+    Each page resumes after the last snapshot seen, so only one page is ever
+    held in memory regardless of collection size.
+    """
+    last = None
+    while True:
+        q = query.limit(page_size)
+        if last is not None:
+            q = q.start_after(last)
+        count = 0
+        for snap in q.stream():
+            count += 1
+            last = snap
+            yield snap.to_dict()
+        if count < page_size:
+            return
@@ -1,12 +1,18 @@
 import base64, json
-from typing import Optional, Dict, Any, List, Tuple
-from google.cloud.firestore_v1 import Query
-from google.api_core.exceptions import FailedPrecondition
+from typing import TYPE_CHECKING, Optional, Dict, Any, Iterable, Iterator, List, Tuple
 from datetime import datetime, timezone
-from app.repositories.firestore_client import get_db
+from app.repositories.firestore_client import get_db, stream_paged, collection_stamp, BATCH_LIMIT
+from app.utils.etag import bump
+from app.semantic.normalizer import normalize
+
+if TYPE_CHECKING:
+    from google.cloud.firestore_v1 import Query
 
 COLL = "help_requests"
 
+# Keys every projection must keep so pagination cursors can be built
+_CURSOR_FIELDS = frozenset({"created_at", "id"})
+
 def _now():
     return datetime.now(timezone.utc)
 
@@ -17,51 +23,72 @@ def _decode_cursor(token: str) -> Tuple[str, str]:
     obj = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
     return obj["created_at"], obj["id"]
 
+def _project(q: "Query", fields: Optional[Iterable[str]]) -> "Query":
+    """Apply a Firestore `select()` projection, always keeping the cursor keys."""
+    if not fields:
+        return q
+    return q.select(sorted(set(fields) | _CURSOR_FIELDS))
+
 def list_help_requests(
     status: Optional[str] = None,
     limit: int = 20,
     cursor: Optional[str] = None,
+    fields: Optional[Iterable[str]] = None,
 ) -> Dict[str, Any]:
     """
     Returns: {"items":[...], "next_cursor": "opaque" | None}
     Ordered newest first by created_at (ISO string), then id for tie-breaker.
     Cursor is an opaque base64 over {created_at, id}.
+    When `fields` is given only those fields (plus the cursor keys) are read.
     """
     db = get_db()
     col = db.collection(COLL)
 
-    q: Query = col
+    q: "Query" = col
     if status:
         q = q.where("status", "==", status)
 
     # Order by created_at desc, then id desc for stable pagination
-    q = q.order_by("created_at", direction=Query.DESCENDING).order_by("id", direction=Query.DESCENDING)
+    q = q.order_by("created_at", direction="DESCENDING").order_by("id", direction="DESCENDING")
 
     if cursor:
         c_created, c_id = _decode_cursor(cursor)
         # start after the last seen document (composite cursor on both fields)
         q = q.start_after({u"created_at": c_created, u"id": c_id})
 
-    q = q.limit(limit)
+    q = _project(q.limit(limit), fields)
 
+    items: List[Dict[str, Any]] = []
+    last: Optional[Dict[str, Any]] = None
     try:
-        snaps = list(q.stream())
-    except FailedPrecondition as e:
+        for s in q.stream():
+            last = s.to_dict()
+            items.append(last)
+    except Exception as e:
+        from google.api_core.exceptions import FailedPrecondition
+        if not isinstance(e, FailedPrecondition):
+            raise
         # Firestore may require a composite index: status + created_at
         # Create the suggested index in the console if this occurs.
         raise RuntimeError(f"Firestore index needed for this query: {e}") from e
 
-    items: List[Dict[str, Any]] = []
-    for s in snaps:
-        items.append(s.to_dict())
-
     # next cursor
     next_cursor = None
-    if len(snaps) == limit:
-        last = snaps[-1].to_dict()
+    if len(items) == limit and last is not None:
         next_cursor = _encode_cursor(last["created_at"], last["id"])
 
     return {"items": items, "next_cursor": next_cursor}
+def iter_updated_since(since: Optional[str] = None, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Stream every help request ordered by updated_at ascending, optionally only
+    those updated strictly after `since` (ISO string), for incremental exports.
+    """
+    q: "Query" = get_db().collection(COLL)
+    if since:
+        q = q.where("updated_at", ">", since)
+    q = q.order_by("updated_at", direction="ASCENDING")
+    return stream_paged(q, page_size)
+
 def mark_followup_sent(help_request_id: str):
     """Mark followup as sent for a help request"""
     db = get_db()
@@ -69,6 +96,7 @@ def mark_followup_sent(help_request_id: str):
         "ai_followup_sent": True,
         "updated_at": _now().isoformat()
     })
+    bump(COLL)
 
 def create_pending(customer_id: str, question: str) -> str:
     """Create a new pending help request"""
@@ -78,6 +106,8 @@ def create_pending(customer_id: str, question: str) -> str:
         "id": doc_ref.id,
         "customer_id": customer_id,
         "question": question,
+        # Lets resolution find other open requests asking the same thing
+        "normalized_question": normalize(question),
         "status": "pending",
         "created_at": _now().isoformat(),
         "updated_at": _now().isoformat(),
@@ -86,6 +116,7 @@ def create_pending(customer_id: str, question: str) -> str:
         "seen_by_supervisor": False,
     }
     doc_ref.set(data)
+    bump(COLL)
     # Emit event for creation
     from app.utils.events import emit_event
     emit_event("help_request.created", {"customer_id": customer_id, "question": question}, doc_ref.id)
@@ -98,6 +129,14 @@ def get(help_request_id: str) -> Optional[Dict[str, Any]]:
     snap = db.collection(COLL).document(help_request_id).get()
     return snap.to_dict() if snap.exists else None
 
+def get_many(help_request_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch several help requests in one batched read; missing ids are omitted"""
+    db = get_db()
+    refs = [db.collection(COLL).document(h_id) for h_id in help_request_ids]
+    if not refs:
+        return {}
+    return {snap.id: snap.to_dict() for snap in db.get_all(refs) if snap.exists}
+
 def set_status(help_request_id: str, status: str, supervisor_answer: Optional[str] = None):
     """Update help request status"""
     db = get_db()
@@ -105,15 +144,55 @@ def set_status(help_request_id: str, status: str, supervisor_answer: Optional[st
     if supervisor_answer is not None:
         patch["supervisor_answer"] = supervisor_answer
     db.collection(COLL).document(help_request_id).update(patch)
+    bump(COLL)
 
-def list_by_status(status: str, limit: int = 200) -> List[dict]:
+def list_by_status(status: str, limit: int = 200, fields: Optional[Iterable[str]] = None) -> List[dict]:
     """List help requests by status with optimized query"""
     db = get_db()
-    snaps = db.collection(COLL).where("status", "==", status).limit(limit).stream()
+    q = db.collection(COLL).where("status", "==", status).limit(limit)
+    snaps = _project(q, fields).stream()
     return [s.to_dict() for s in snaps]
 
+def list_pending_by_question(normalized_question: str, limit: int = 500) -> List[Tuple[str, Dict[str, Any], Any]]:
+    """
+    Pending help requests with the given normalized question, as
+    (id, doc, update_time) triples; update_time is for write preconditions
+    """
+    db = get_db()
+    q = (db.collection(COLL)
+         .where("status", "==", "pending")
+         .where("normalized_question", "==", normalized_question)
+         .limit(limit))
+    return [(s.id, s.to_dict(), s.update_time) for s in q.stream()]
+
+def backfill_normalized_questions() -> int:
+    """
+    Set `normalized_question` on pending requests created before it existed,
+    so `list_pending_by_question` can match them. Returns how many were updated.
+    """
+    db = get_db()
+    batch = db.batch()
+    updated = 0
+    for s in db.collection(COLL).where("status", "==", "pending").stream():
+        doc = s.to_dict()
+        if doc.get("normalized_question") or not doc.get("question"):
+            continue
+        batch.update(s.reference, {"normalized_question": normalize(doc["question"])})
+        updated += 1
+        if updated % BATCH_LIMIT == 0:
+            batch.commit()
+            batch = db.batch()
+    if updated % BATCH_LIMIT:
+        batch.commit()
+    return updated
+
 def mark_unresolved(help_request_id: str):
     """Mark help request as unresolved"""
     db = get_db()
     patch = {"status": "unresolved", "updated_at": _now().isoformat()}
     db.collection(COLL).document(help_request_id).update(patch)
+    bump(COLL)
+
+def version_stamp() -> str:
+    """Change stamp used for list ETags"""
+    return collection_stamp(COLL)
@@ -1,7 +1,10 @@
 from fastapi import APIRouter
 from app.services.kb_service import clear_cache
-from app.repositories.firestore_client import close_db
-import psutil
+from app.services.admission import stats as admission_stats
+from app.services import kb_invalidation
+from app.agent import speech_queue
+from app.utils import etag
+from app.repositories.firestore_client import reconnect
 import time
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -18,12 +21,15 @@ def admin_status():
 def performance_metrics():
     """Get performance metrics"""
     try:
+        # psutil is only needed here, so keep it off the startup path
+        import psutil
+
         # System metrics
         cpu_percent = psutil.cpu_percent(interval=1)
         memory = psutil.virtual_memory()
         
         # Cache metrics
-        from app.services.kb_service import _kb_cache, normalize
+        from app.services.kb_service import _kb_cache, normalize, cache_tier_stats
         cache_size = len(_kb_cache)
         cache_hits = normalize.cache_info().hits
         cache_misses = normalize.cache_info().misses
@@ -38,13 +44,24 @@ def performance_metrics():
                 "kb_cache_size": cache_size,
                 "normalize_cache_hits": cache_hits,
                 "normalize_cache_misses": cache_misses,
-                "normalize_cache_hit_rate": round(cache_hits / (cache_hits + cache_misses) * 100, 2) if (cache_hits + cache_misses) > 0 else 0
+                "normalize_cache_hit_rate": round(cache_hits / (cache_hits + cache_misses) * 100, 2) if (cache_hits + cache_misses) > 0 else 0,
+                "kb_lookup_tiers": cache_tier_stats(),
             },
+            "admission": admission_stats(),
+            "kb_invalidation": kb_invalidation.stats(),
+            # Summed across agent worker processes
+            "speech_queue": speech_queue.worker_metrics(),
             "timestamp": time.time()
         }
     except Exception as e:
         return {"error": str(e)}
 
+@router.get("/startup-profile")
+def startup_profile_report():
+    """Import and lifespan phase timings (populated when STARTUP_PROFILE=true)"""
+    from app.utils import startup_profile
+    return startup_profile.snapshot()
+
 @router.post("/cache/clear")
 def clear_all_cache():
     """Clear all caches"""
@@ -56,9 +73,13 @@ def clear_all_cache():
 
 @router.post("/db/reconnect")
 def reconnect_database():
-    """Reconnect to database"""
+    """Reconnect to database, draining in-flight calls on the old connection"""
     try:
-        close_db()
-        return {"message": "Database connection reset"}
+        result = reconnect()
+        # The invalidation watch lives on the old client; reopen it on the new
+        # one, resuming where the old watch left off
+        kb_invalidation.restart()
+        etag.rewatch()
+        return {"message": "Database connection reset", **result}
     except Exception as e:
         return {"error": str(e)}
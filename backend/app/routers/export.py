@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from app.config import settings
+from app.repositories import help_requests_repo as repo
+from app.services.kb_service import iter_knowledge_base_items
+import json
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+NDJSON = "application/x-ndjson"
+
+
+def _since_iso(since: Optional[datetime]) -> Optional[str]:
+    """Normalize `since` to the UTC ISO format stored in `updated_at`."""
+    if since is None:
+        return None
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return since.astimezone(timezone.utc).isoformat()
+
+
+def _ndjson(docs: Iterable[dict]):
+    for doc in docs:
+        yield json.dumps(doc, default=str) + "\n"
+
+
+@router.get("/help-requests")
+def export_help_requests(
+    since: Optional[datetime] = Query(None, description="Only rows updated after this timestamp"),
+    page_size: int = Query(settings.EXPORT_PAGE_SIZE, ge=1, le=1000),
+):
+    """Stream all help requests as NDJSON, oldest update first"""
+    docs = repo.iter_updated_since(since=_since_iso(since), page_size=page_size)
+    return StreamingResponse(_ndjson(docs), media_type=NDJSON)
+
+
+@router.get("/kb")
+def export_kb(
+    since: Optional[datetime] = Query(None, description="Only items updated after this timestamp"),
+    page_size: int = Query(settings.EXPORT_PAGE_SIZE, ge=1, le=1000),
+):
+    """Stream all knowledge base items as NDJSON, oldest update first"""
+    docs = iter_knowledge_base_items(since=_since_iso(since), page_size=page_size)
+    return StreamingResponse(_ndjson(docs), media_type=NDJSON)
@@ -1,6 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 from datetime import datetime, timezone
 from app.version import VERSION
+from app.repositories.firestore_client import ping
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -11,3 +12,16 @@ def health():
         "version": VERSION,
         "time_utc": datetime.now(timezone.utc).isoformat()
     }
+
+@router.get("/deep")
+def health_deep(response: Response):
+    """Health check that also measures a Firestore round trip on every channel"""
+    db = ping()
+    if not db["ok"]:
+        response.status_code = 503
+    return {
+        "status": "ok" if db["ok"] else "degraded",
+        "version": VERSION,
+        "time_utc": datetime.now(timezone.utc).isoformat(),
+        "firestore": db,
+    }
@@ -1,30 +1,57 @@
 
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from typing import Optional
-from app.models.help_requests import CreateHelpRequest, HelpRequestOut, ResolveHelpRequest
+import logging
+from pydantic import ValidationError
+from datetime import datetime, timezone
+from app.models.help_requests import (
+    CreateHelpRequest, HelpRequestOut, ResolveHelpRequest,
+    HelpRequestItem, HelpRequestPage, HELP_REQUEST_FIELDS,
+)
 from app.repositories import help_requests_repo as repo
 from app.services import help_request_service
+from app.utils.etag import conditional, bump
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/help-requests", tags=["help-requests"])
 
+def _parse_fields(fields: Optional[str]) -> Optional[list[str]]:
+    """Split a `?fields=a,b` projection and reject unknown names."""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(names) - HELP_REQUEST_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
 # List help requests with status filter and cursor pagination
-@router.get("")
+@router.get("", response_model=HelpRequestPage, response_model_exclude_unset=True)
 def list_help_requests(
+    request: Request,
+    response: Response,
     status: Optional[str] = Query(None, pattern="^(pending|resolved|unresolved)$"),
     limit: int = Query(20, ge=1, le=100),
     cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated projection, e.g. id,question,status"),
 ):
+    projection = _parse_fields(fields)
+    not_modified = conditional(request, response, repo.COLL, repo.version_stamp)
+    if not_modified is not None:
+        return not_modified
     try:
         # If caller only filters by status and there's no cursor, use a simpler
         # optimized query that doesn't require the composite index. This avoids
         # the Firestore "index needed" 500 for common UI list views.
         if status and not cursor:
-            items = repo.list_by_status(status=status, limit=limit)
-            return {"items": items, "next_cursor": None}
-
-        return repo.list_help_requests(status=status, limit=limit, cursor=cursor)
+            items = repo.list_by_status(status=status, limit=limit, fields=projection)
+            page = {"items": items, "next_cursor": None}
+        else:
+            page = repo.list_help_requests(status=status, limit=limit, cursor=cursor, fields=projection)
     except RuntimeError as e:
         # Return a clearer message when Firestore requires a composite index
         msg = str(e)
@@ -32,6 +59,20 @@ def list_help_requests(
             raise HTTPException(status_code=500, detail=f"Firestore index required for this query. {msg}")
         raise HTTPException(status_code=500, detail=msg)
 
+    # Validate each document once, skipping ones that don't fit the model
+    items = []
+    for doc in page["items"]:
+        try:
+            items.append(HelpRequestItem.model_validate(doc))
+        except ValidationError as e:
+            bad = ", ".join(".".join(map(str, err["loc"])) for err in e.errors())
+            logger.warning(f"Skipping malformed help request {doc.get('id')!r} in list: {bad}")
+    body = HelpRequestPage(items=items, next_cursor=page["next_cursor"])
+    # Serialized here so response_model doesn't validate the page a second
+    # time; it still documents the schema
+    headers = {"ETag": response.headers["etag"]} if "etag" in response.headers else None
+    return Response(content=body.model_dump_json(exclude_unset=True), media_type="application/json", headers=headers)
+
 
 @router.post("", response_model=HelpRequestOut, status_code=201)
 def create_help_request(payload: CreateHelpRequest):
@@ -69,7 +110,9 @@ def mark_all_help_requests_seen():
         docs = list(col.where("status", "==", "resolved").where("seen_by_supervisor", "==", False)
                     .order_by("resolved_at", direction="DESCENDING").limit(1).stream())
         for doc in docs:
-            doc.reference.update({"seen_by_supervisor": True})
+            doc.reference.update({"seen_by_supervisor": True, "updated_at": datetime.now(timezone.utc).isoformat()})
+        if docs:
+            bump(repo.COLL)
         return {"ok": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
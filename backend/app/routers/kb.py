@@ -1,12 +1,22 @@
-from fastapi import APIRouter, HTTPException
-from app.services.kb_service import list_knowledge_base_items, exact_lookup
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from app.services import kb_service
+from app.services.kb_service import list_knowledge_base_items, exact_lookup, import_knowledge_base_items
+from app.utils.etag import conditional
+import csv
+import io
+import json
 
 router = APIRouter(prefix="/kb", tags=["knowledge_base"])
 
 
 @router.get("")
-def get_kb(limit: int = 50):
+def get_kb(request: Request, response: Response, limit: int = 50):
     """Compatibility endpoint: return knowledge base items at `/kb` to match frontend expectations"""
+    not_modified = conditional(request, response, kb_service.COLL, kb_service.version_stamp)
+    if not_modified is not None:
+        return not_modified
     try:
         items = list_knowledge_base_items(limit=limit)
         return {"items": items}
@@ -14,8 +24,11 @@ def get_kb(limit: int = 50):
         raise HTTPException(status_code=500, detail=f"Error fetching KB items: {str(e)}")
 
 @router.get("/items")
-def get_kb_items(limit: int = 50):
+def get_kb_items(request: Request, response: Response, limit: int = 50):
     """Get all knowledge base items"""
+    not_modified = conditional(request, response, kb_service.COLL, kb_service.version_stamp)
+    if not_modified is not None:
+        return not_modified
     try:
         items = list_knowledge_base_items(limit=limit)
         return {"items": items}
@@ -43,49 +56,43 @@ def search_kb(question: str):
             }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching KB: {str(e)}")
-from fastapi import APIRouter, HTTPException
-from app.services.kb_service import list_knowledge_base_items, exact_lookup
-
-router = APIRouter(prefix="/kb", tags=["knowledge_base"])
 
+def _parse_import_payload(body: bytes, fmt: str) -> list:
+    """Decode a JSON array / {"items": [...]}, CSV with a header row, or NDJSON body"""
+    text = body.decode("utf-8-sig")
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(text)))
+    if fmt == "ndjson":
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("items", [])
+    if not isinstance(data, list):
+        raise ValueError("JSON body must be a list or an object with an 'items' list")
+    return data
 
-@router.get("")
-def get_kb(limit: int = 50):
-    """Compatibility endpoint: return knowledge base items at `/kb` to match frontend expectations"""
-    try:
-        items = list_knowledge_base_items(limit=limit)
-        return {"items": items}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching KB items: {str(e)}")
+def _detect_format(content_type: str) -> str:
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return "json"
 
-@router.get("/items")
-def get_kb_items(limit: int = 50):
-    """Get all knowledge base items"""
+@router.post("/import")
+async def import_kb(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(json|csv|ndjson)$"),
+    source: str = "import",
+):
+    """Bulk import Q&A pairs from JSON, CSV or NDJSON (format from ?format= or Content-Type)"""
+    fmt = format or _detect_format(request.headers.get("content-type", ""))
     try:
-        items = list_knowledge_base_items(limit=limit)
-        return {"items": items}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching KB items: {str(e)}")
-
-@router.get("/search")
-def search_kb(question: str):
-    """Search knowledge base for exact matches"""
+        items = _parse_import_payload(await request.body(), fmt)
+        if not all(isinstance(item, dict) for item in items):
+            raise ValueError("Each item must be an object with question and answer")
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {fmt} payload: {str(e)}")
     try:
-        result = exact_lookup(question)
-        if result:
-            kb_id, answer = result
-            return {
-                "found": True,
-                "kb_id": kb_id,
-                "answer": answer,
-                "source": "exact_match"
-            }
-        else:
-            return {
-                "found": False,
-                "answer": None,
-                "source": "no_match"
-            }
+        return await run_in_threadpool(import_knowledge_base_items, items, source)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error searching KB: {str(e)}")
-
+        raise HTTPException(status_code=500, detail=f"Error importing KB items: {str(e)}")
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from app.config import settings
-from livekit.api import AccessToken, VideoGrants
+from app.services import livekit_tokens
 import time
 import uuid
 
@@ -11,6 +12,15 @@ class TokenRequest(BaseModel):
     room: str = "frontdesk-demo"
     identity: str = None
 
+class TokenBatchRequest(BaseModel):
+    room: str = "frontdesk-demo"
+    # Bounded here so an oversized count is rejected before identities are generated
+    count: Optional[int] = Field(default=None, ge=1, le=settings.LIVEKIT_TOKEN_MAX_BATCH)
+    identities: Optional[List[str]] = Field(default=None, max_length=settings.LIVEKIT_TOKEN_MAX_BATCH)
+    identity_prefix: str = "caller"
+    name: str = "Customer"
+    ttl_seconds: Optional[int] = Field(default=None, ge=60)
+
 @router.get("/status")
 def livekit_status():
     """LiveKit status endpoint"""
@@ -27,7 +37,8 @@ def create_token_get(identity: str = None, room: str = "frontdesk-demo"):
         if not identity:
             identity = f"caller-{int(time.time() * 1000)}"
         
-        # Create token using LiveKit server SDK API
+        # Create token using LiveKit server SDK API (imported on first use)
+        from livekit.api import AccessToken, VideoGrants
         token = AccessToken(settings.LIVEKIT_API_KEY, settings.LIVEKIT_API_SECRET)
         token.with_identity(identity)
         token.with_name("Customer")
@@ -58,7 +69,8 @@ def create_token_post(request: TokenRequest):
         if not request.identity:
             request.identity = f"caller-{int(time.time() * 1000)}"
         
-        # Create token using LiveKit server SDK API
+        # Create token using LiveKit server SDK API (imported on first use)
+        from livekit.api import AccessToken, VideoGrants
         token = AccessToken(settings.LIVEKIT_API_KEY, settings.LIVEKIT_API_SECRET)
         token.with_identity(request.identity)
         token.with_name("Customer")
@@ -80,3 +92,25 @@ def create_token_post(request: TokenRequest):
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating token: {str(e)}")
+
+@router.post("/tokens")
+def create_tokens_bulk(request: TokenBatchRequest):
+    """Mint many LiveKit tokens in one call (for dialers pre-fetching campaign batches)"""
+    identities = request.identities or livekit_tokens.default_identities(request.count or 1, request.identity_prefix)
+    if len(identities) > settings.LIVEKIT_TOKEN_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {settings.LIVEKIT_TOKEN_MAX_BATCH} tokens per request")
+    if len(set(identities)) != len(identities):
+        raise HTTPException(status_code=400, detail="Identities must be unique")
+    ttl = request.ttl_seconds or settings.LIVEKIT_TOKEN_TTL_SECONDS
+    try:
+        now = int(time.time())
+        tokens = livekit_tokens.get_minter().mint_many(identities, request.room, ttl, name=request.name, now=now)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating tokens: {str(e)}")
+    return {
+        "url": settings.LIVEKIT_URL,
+        "room": request.room,
+        "ttl_seconds": ttl,
+        "expires_at": now + ttl,
+        "tokens": [{"identity": i, "token": t} for i, t in zip(identities, tokens)],
+    }
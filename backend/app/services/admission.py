@@ -0,0 +1,148 @@
+"""
+Admission control for escalation writes.
+
+A stuck caller or an STT loop can escalate the same conversation over and
+over, and each escalation is a new help_requests document (plus a resolution
+listener on the agent). Token buckets cap escalations per customer_id and
+across the process. A shed call doesn't write anything. If it repeats the
+customer's last escalated question it gets that help request id back, so
+callers can answer with an "already escalated" reply; any other shed call
+(a new question, or a first escalation shed by the global limit) has no
+help request and gets a "busy, try again" reply instead. Shed counters are
+exposed via `stats()`.
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.repositories import help_requests_repo
+from app.semantic.normalizer import normalize
+
+ALREADY_ESCALATED_MESSAGE = (
+    "I've already passed your question to my supervisor. "
+    "I'll get back to you as soon as I hear from them."
+)
+BUSY_MESSAGE = (
+    "I'm sorry, we're handling a lot of requests right now. "
+    "Please ask me again in a moment."
+)
+
+# Idle per-customer buckets are pruned once the table grows past this
+_MAX_CUSTOMER_BUCKETS = 10000
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def give_back(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class EscalationThrottled(Exception):
+    """Raised instead of writing when an escalation is over its rate limit."""
+
+    def __init__(self, scope: str, help_request_id: Optional[str] = None):
+        super().__init__(f"escalation rate limit exceeded ({scope})")
+        self.scope = scope
+        self.help_request_id = help_request_id
+
+    @property
+    def message(self) -> str:
+        """What to tell the caller: "already escalated" only if a request exists."""
+        return ALREADY_ESCALATED_MESSAGE if self.help_request_id else BUSY_MESSAGE
+
+
+class AdmissionController:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._global = TokenBucket(settings.ESCALATION_GLOBAL_RATE_PER_SECOND, settings.ESCALATION_GLOBAL_BURST)
+        self._customers: Dict[str, TokenBucket] = {}
+        # customer_id -> (help_request_id, normalized question) of the last escalation
+        self._last_escalation: Dict[str, Tuple[str, str]] = {}
+        self.counters: Counter = Counter()
+
+    def _customer_bucket(self, customer_id: str, now: float) -> TokenBucket:
+        bucket = self._customers.get(customer_id)
+        if bucket is None:
+            if len(self._customers) >= _MAX_CUSTOMER_BUCKETS:
+                for key in [k for k, b in self._customers.items() if b.is_full(now)]:
+                    del self._customers[key]
+                    self._last_escalation.pop(key, None)
+            bucket = TokenBucket(settings.ESCALATION_RATE_PER_CUSTOMER_PER_MINUTE / 60.0,
+                                 settings.ESCALATION_BURST_PER_CUSTOMER)
+            self._customers[customer_id] = bucket
+        return bucket
+
+    def _reusable(self, customer_id: str, question: str) -> Optional[str]:
+        """The customer's last help request id, if it was for this same question."""
+        last = self._last_escalation.get(customer_id)
+        if last is not None and last[1] == normalize(question):
+            return last[0]
+        return None
+
+    def admit(self, customer_id: str, question: str = ""):
+        """Take one escalation token; raises EscalationThrottled when over limit."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._customer_bucket(customer_id, now)
+            if not bucket.take(now):
+                self.counters["shed_customer"] += 1
+                raise EscalationThrottled("customer", self._reusable(customer_id, question))
+            if not self._global.take(now):
+                # Don't charge the customer for a call the global limit shed
+                bucket.give_back()
+                self.counters["shed_global"] += 1
+                raise EscalationThrottled("global", self._reusable(customer_id, question))
+            self.counters["admitted"] += 1
+
+    def record(self, customer_id: str, help_request_id: str, question: str = ""):
+        with self._lock:
+            self._last_escalation[customer_id] = (help_request_id, normalize(question))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "admitted": self.counters["admitted"],
+                "shed_customer": self.counters["shed_customer"],
+                "shed_global": self.counters["shed_global"],
+                "tracked_customers": len(self._customers),
+            }
+
+
+controller = AdmissionController()
+
+
+def create_pending(customer_id: str, question: str) -> str:
+    """`help_requests_repo.create_pending` behind the escalation rate limits."""
+    controller.admit(customer_id, question)
+    help_request_id = help_requests_repo.create_pending(customer_id, question)
+    controller.record(customer_id, help_request_id, question)
+    return help_request_id
+
+
+def stats() -> Dict[str, int]:
+    return controller.stats()
@@ -10,8 +10,8 @@ The service implements a two-tier approach:
 2. Escalation to human supervisors for unknown queries
 """
 
-from app.services import kb_service
-from app.repositories import help_requests_repo as help_repo
+from app.services import admission, kb_service
+from app.services.pending_index import pending
 
 
 def answer_or_escalate(customer_id: str, text: str):
@@ -44,8 +44,28 @@ def answer_or_escalate(customer_id: str, text: str):
             "answer": answer
         }
     
-    # No exact match found - escalate to human supervisor
-    help_id = help_repo.create_pending(customer_id, text)
+    # Someone already asked this and it's still open: share that request
+    # instead of writing another one
+    open_id = pending.find(text)
+    if open_id:
+        return {
+            "known": False,
+            "help_request_id": open_id,
+            "message": "I'll check with a supervisor and get back to you soon.",
+            "coalesced": True,
+        }
+
+    # No exact match found - escalate to human supervisor (rate limited per
+    # customer and globally; a shed repeat of the last question reuses its
+    # escalation, anything else is told to try again)
+    try:
+        help_id = admission.create_pending(customer_id, text)
+    except admission.EscalationThrottled as e:
+        response = {"known": False, "message": e.message, "throttled": True}
+        if e.help_request_id:
+            response["help_request_id"] = e.help_request_id
+        return response
+    pending.add(text, help_id)
     return {
         "known": False,
         "help_request_id": help_id,
@@ -14,8 +14,11 @@ Key functionality:
 
 from datetime import datetime, timezone
 from fastapi import HTTPException
-from app.repositories.firestore_client import get_db
+from app.repositories.firestore_client import get_db, BATCH_LIMIT
+from app.repositories import help_requests_repo
 from app.services import kb_service
+from app.services.pending_index import pending
+from app.utils.etag import bump
 
 # Firestore collection name for help requests
 COLL = "help_requests"
@@ -35,9 +38,12 @@ def resolve_pending(help_request_id: str, supervisor_answer: str, resolver: str)
     
     This function implements the complete resolution workflow:
     1. Validates the help request exists and is in pending status
-    2. Updates the help request with resolution details
+    2. Updates the help request, then every other pending request with the
+       same normalized question, with resolution details in write batches.
+       Every write is conditioned on the document being unchanged since it
+       was read, so a request cancelled or resolved meanwhile is left alone
     3. Adds the Q&A pair to the knowledge base
-    4. Emits events for auditing and notifications
+    4. Emits events for auditing and notifications (for each resolved request)
     5. Returns the updated help request data
     
     Args:
@@ -46,10 +52,12 @@ def resolve_pending(help_request_id: str, supervisor_answer: str, resolver: str)
         resolver (str): Identifier of the supervisor who resolved the request
         
     Returns:
-        dict: Updated help request data with resolution details
+        dict: Updated help request data with resolution details, plus the ids
+        of matching requests that were auto-resolved
         
     Raises:
-        HTTPException: If help request not found or not in pending status
+        HTTPException: If help request not found, not in pending status, or
+        changed while being resolved
     """
     db = get_db()
     doc_ref = db.collection(COLL).document(help_request_id)
@@ -70,7 +78,46 @@ def resolve_pending(help_request_id: str, supervisor_answer: str, resolver: str)
         "ai_followup_sent": True,   # Mark as follow-up sent to customer
         "seen_by_supervisor": False,  # Reset notification status
     }
-    doc_ref.update(patch)
+
+    from google.api_core.exceptions import FailedPrecondition
+    try:
+        doc_ref.update(patch, option=db.write_option(last_update_time=snap.update_time))
+    except FailedPrecondition:
+        raise HTTPException(status_code=409, detail="Help request changed while resolving; reload and retry")
+
+    # Other callers waiting on the same question get the same answer
+    normalized_question = doc.get("normalized_question") or kb_service.normalize(doc["question"])
+    others = [
+        (other_id, update_time)
+        for other_id, _, update_time in help_requests_repo.list_pending_by_question(normalized_question)
+        if other_id != help_request_id
+    ]
+    other_patch = {**patch, "auto_resolved_from": help_request_id}
+    auto_resolved = []
+    for i in range(0, len(others), BATCH_LIMIT):
+        chunk = others[i:i + BATCH_LIMIT]
+        batch = db.batch()
+        for other_id, update_time in chunk:
+            batch.update(db.collection(COLL).document(other_id), other_patch,
+                         option=db.write_option(last_update_time=update_time))
+        try:
+            batch.commit()
+            auto_resolved.extend(other_id for other_id, _ in chunk)
+            continue
+        except FailedPrecondition:
+            pass
+        # A request in this chunk changed since it was listed (and the batch
+        # is all-or-nothing): write them one by one, skipping the changed ones
+        for other_id, update_time in chunk:
+            try:
+                db.collection(COLL).document(other_id).update(
+                    other_patch, option=db.write_option(last_update_time=update_time))
+                auto_resolved.append(other_id)
+            except FailedPrecondition:
+                pass
+    bump(COLL)
+    for resolved_id in [help_request_id, *auto_resolved]:
+        pending.discard(resolved_id)
 
     # Add the Q&A pair to the knowledge base for future use
     kb_id = kb_service.upsert_supervisor_answer(question_raw=doc["question"], answer=supervisor_answer)
@@ -79,6 +126,9 @@ def resolve_pending(help_request_id: str, supervisor_answer: str, resolver: str)
     from app.utils.events import emit_event
     emit_event("help_request.resolved", {"resolver": resolver, "answer": supervisor_answer, "kb_id": kb_id}, help_request_id)
     emit_event("followup.sent", {"text": f"I checked with my supervisor: {supervisor_answer}"}, help_request_id)
+    for other_id in auto_resolved:
+        emit_event("help_request.resolved", {"resolver": resolver, "answer": supervisor_answer, "kb_id": kb_id, "auto_resolved_from": help_request_id}, other_id)
+        emit_event("followup.sent", {"text": f"I checked with my supervisor: {supervisor_answer}"}, other_id)
 
     # Return the complete updated help request data
-    return {**doc, **patch, "kb_id": kb_id, "id": help_request_id}
+    return {**doc, **patch, "kb_id": kb_id, "id": help_request_id, "auto_resolved": auto_resolved}
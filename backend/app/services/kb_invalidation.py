@@ -0,0 +1,203 @@
+"""
+Cross-process KB cache invalidation.
+
+Each process (uvicorn worker or agent worker) keeps one Firestore watch on
+knowledge base entries updated since it started. Every added, modified or
+deleted entry is applied to the local `_kb_cache` straight from the watch
+event, so a supervisor's corrected answer reaches every process within the
+watch latency instead of after KB_CACHE_TTL_SECONDS. Keys are refreshed in
+place rather than dropped. Keys this process hasn't cached are left alone,
+so a first lookup can still hit a snapshot file that hasn't been re-exported
+yet; such hits are cached for only KB_SNAPSHOT_HIT_TTL_SECONDS before being
+revalidated against Firestore.
+
+While the feed is live the cache TTL is raised to
+KB_CACHE_TTL_WITH_INVALIDATION_SECONDS. If the watch can't be opened, or
+the server closes it, the process drops back to the normal TTL; a monitor
+thread notices a dead watch and reopens it. Reopening (also after a database
+reconnect) resumes from the last snapshot the old watch delivered, less a
+small margin for writer clock skew, so writes made while no watch was open
+are still applied.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from app.config import settings
+from app.repositories.firestore_client import get_db
+from app.services import kb_service, kb_snapshot
+
+logger = logging.getLogger(__name__)
+
+# How often the monitor checks that the watch is still streaming
+_CHECK_INTERVAL = 10.0
+# Re-delivered window when a watch is reopened (writers stamp updated_at with
+# their own clocks); replaying a change is harmless
+_RESUME_MARGIN = timedelta(seconds=60)
+
+
+class KBInvalidationFeed:
+    def __init__(self):
+        self._watch = None
+        self._lock = threading.Lock()
+        self._wanted = False
+        self._monitor: Optional[threading.Thread] = None
+        self._since: Optional[str] = None
+        self._last_read: Optional[datetime] = None
+        self.counters: Counter = Counter()
+
+    @property
+    def running(self) -> bool:
+        return self._watch is not None
+
+    def _resume_point(self) -> str:
+        if self._last_read is not None:
+            return (self._last_read - _RESUME_MARGIN).isoformat()
+        return self._since or datetime.now(timezone.utc).isoformat()
+
+    def _open(self, since: str):
+        query = get_db().collection(kb_service.COLL).where("updated_at", ">=", since)
+        watch = query.on_snapshot(self._on_snapshot)
+        self._since = since
+        return watch
+
+    def start(self) -> bool:
+        """Open the watch; returns False (and keeps the normal TTL) on failure."""
+        with self._lock:
+            self._wanted = True
+            self._ensure_monitor()
+            if self._watch is not None:
+                return True
+            since = self._resume_point()
+            try:
+                self._watch = self._open(since)
+            except Exception as e:
+                logger.warning(f"KB invalidation feed unavailable, keeping TTL-only caching: {e}")
+                return False
+        kb_service.set_cache_ttl(settings.KB_CACHE_TTL_WITH_INVALIDATION_SECONDS)
+        logger.info(f"KB invalidation feed started (updated_at >= {since})")
+        return True
+
+    def restart(self) -> bool:
+        """
+        Reopen the watch (e.g. on a new Firestore client) without a delivery gap:
+        the new watch resumes where the old one left off and is opened before
+        the old one is closed.
+        """
+        with self._lock:
+            self._wanted = True
+            self._ensure_monitor()
+            old, since = self._watch, self._resume_point()
+            try:
+                self._watch = self._open(since)
+            except Exception as e:
+                logger.warning(f"KB invalidation feed reopen failed, falling back to TTL-only caching: {e}")
+                self._watch = None
+        _unsubscribe(old)
+        if self._watch is None:
+            kb_service.set_cache_ttl(settings.KB_CACHE_TTL_SECONDS)
+            return False
+        kb_service.set_cache_ttl(settings.KB_CACHE_TTL_WITH_INVALIDATION_SECONDS)
+        logger.info(f"KB invalidation feed reopened (updated_at >= {since})")
+        return True
+
+    def stop(self):
+        with self._lock:
+            self._wanted = False
+            watch, self._watch = self._watch, None
+        if watch is None:
+            return
+        kb_service.set_cache_ttl(settings.KB_CACHE_TTL_SECONDS)
+        _unsubscribe(watch)
+
+    def check(self):
+        """Fall back to the normal TTL and reopen if the watch has died."""
+        with self._lock:
+            watch, wanted = self._watch, self._wanted
+        if not wanted or (watch is not None and getattr(watch, "is_active", True)):
+            return
+        if watch is not None:
+            logger.warning("KB invalidation watch closed by the server; reopening")
+            self.counters["watch_lost"] += 1
+        kb_service.set_cache_ttl(settings.KB_CACHE_TTL_SECONDS)
+        self.restart()
+
+    def _ensure_monitor(self):
+        # Called with self._lock held
+        if self._monitor is not None:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(_CHECK_INTERVAL)
+                try:
+                    self.check()
+                except Exception as e:
+                    logger.warning(f"KB invalidation feed check failed: {e}")
+
+        self._monitor = threading.Thread(target=_loop, name="kb-invalidation-monitor", daemon=True)
+        self._monitor.start()
+
+    def _on_snapshot(self, docs, changes, read_time):
+        # Runs on the Firestore watch thread; the cache has its own lock
+        for change in changes:
+            data = change.document.to_dict() or {}
+            key = data.get("normalized_question")
+            if not key:
+                continue
+            self.counters["events"] += 1
+            if change.type.name == "REMOVED":
+                result = None
+            else:
+                result = (change.document.id, data.get("answer", ""))
+            if kb_service.apply_remote_change(key, result):
+                self.counters["refreshed"] += 1
+        if changes:
+            # In the exporter, writes made by other processes also re-export
+            kb_snapshot.schedule_export()
+        if read_time is not None:
+            self._last_read = read_time
+
+    def stats(self) -> Dict[str, object]:
+        return {"running": self.running, **self.counters}
+
+
+_feed: Optional[KBInvalidationFeed] = None
+
+
+def start() -> bool:
+    """Start this process's feed (idempotent)."""
+    global _feed
+    if _feed is None:
+        _feed = KBInvalidationFeed()
+    return _feed.start()
+
+
+def restart() -> bool:
+    """Reopen this process's feed, e.g. after a database reconnect."""
+    global _feed
+    if _feed is None:
+        _feed = KBInvalidationFeed()
+    return _feed.restart()
+
+
+def stop():
+    if _feed is not None:
+        _feed.stop()
+
+
+def _unsubscribe(watch):
+    if watch is None:
+        return
+    try:
+        watch.unsubscribe()
+    except Exception as e:
+        logger.warning(f"Failed to unsubscribe KB invalidation feed: {e}")
+
+
+def stats() -> Dict[str, object]:
+    return _feed.stats() if _feed is not None else {"running": False}
@@ -0,0 +1,128 @@
+"""
+Optional host-wide second-tier KB cache shared by every local process.
+
+A SQLite database in WAL mode (readers never block the writer) keyed by
+normalized question, holding positive results and negative (no match)
+results with the time they were stored. It sits between the in-process
+`_kb_cache` and Firestore in `kb_service.exact_lookup`, so a question one
+process has already fetched costs the other processes on the host a local
+read instead of a Firestore query. Enabled by setting KB_L2_CACHE_PATH.
+
+The L2 is strictly best-effort: any SQLite error (locked, corrupt, missing
+directory) is logged and treated as a miss.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Expired rows are pruned once every this many writes
+_PRUNE_EVERY = 1000
+
+
+class SQLiteL2Cache:
+    def __init__(self, path: str, busy_timeout_ms: int = 50):
+        self.path = path
+        self._busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kb_l2 ("
+            " key TEXT PRIMARY KEY, kb_id TEXT, answer TEXT, stored_at REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads; one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self._busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, ttl: float) -> Tuple[bool, Optional[Tuple[str, str]]]:
+        """(present, result) like kb_service's L1; result None is a cached miss."""
+        try:
+            row = self._conn().execute(
+                "SELECT kb_id, answer, stored_at FROM kb_l2 WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"KB L2 read failed: {e}")
+            return False, None
+        if row is None or time.time() - row[2] >= ttl:
+            return False, None
+        return True, ((row[0], row[1]) if row[0] is not None else None)
+
+    def set_many(self, results: Dict[str, Optional[Tuple[str, str]]]):
+        now = time.time()
+        rows = [
+            (key, result[0] if result else None, result[1] if result else None, now)
+            for key, result in results.items()
+        ]
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT OR REPLACE INTO kb_l2 VALUES (?, ?, ?, ?)", rows)
+            self._writes += len(rows)
+            if self._writes >= _PRUNE_EVERY:
+                self._writes = 0
+                conn.execute("DELETE FROM kb_l2 WHERE stored_at < ?",
+                             (now - settings.KB_CACHE_TTL_WITH_INVALIDATION_SECONDS,))
+        except sqlite3.Error as e:
+            logger.debug(f"KB L2 write failed: {e}")
+
+    def set(self, key: str, result: Optional[Tuple[str, str]]):
+        self.set_many({key: result})
+
+    def refresh(self, key: str, result: Optional[Tuple[str, str]]):
+        """Overwrite `key` only if it's already cached (used for change feeds)."""
+        try:
+            self._conn().execute(
+                "UPDATE kb_l2 SET kb_id = ?, answer = ?, stored_at = ? WHERE key = ?",
+                (result[0] if result else None, result[1] if result else None, time.time(), key),
+            )
+        except sqlite3.Error as e:
+            logger.debug(f"KB L2 refresh failed: {e}")
+
+    def delete(self, key: str):
+        try:
+            self._conn().execute("DELETE FROM kb_l2 WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.debug(f"KB L2 delete failed: {e}")
+
+    def clear(self):
+        try:
+            self._conn().execute("DELETE FROM kb_l2")
+        except sqlite3.Error as e:
+            logger.debug(f"KB L2 clear failed: {e}")
+
+
+_l2: Optional[SQLiteL2Cache] = None
+_l2_lock = threading.Lock()
+_l2_failed = False
+
+
+def get_l2() -> Optional[SQLiteL2Cache]:
+    """This process's handle on the shared L2, or None if disabled/unavailable."""
+    global _l2, _l2_failed
+    if _l2 is not None or _l2_failed or not settings.KB_L2_CACHE_PATH:
+        return _l2
+    with _l2_lock:
+        if _l2 is None and not _l2_failed:
+            try:
+                _l2 = SQLiteL2Cache(settings.KB_L2_CACHE_PATH)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"KB L2 cache disabled: {e}")
+                _l2_failed = True
+    return _l2
@@ -1,6 +1,10 @@
-from typing import Optional, Tuple, Dict, Any
-from app.repositories.firestore_client import get_db
+from typing import Optional, Tuple, Dict, Any, Iterable, Iterator
+from app.repositories.firestore_client import get_db, stream_paged, collection_stamp, BATCH_LIMIT
+from app.utils.etag import bump
+from app.services import kb_snapshot
+from app.services.kb_l2 import get_l2
 from app.config import settings
+from collections import Counter
 import re
 import time
 from functools import lru_cache
@@ -16,6 +20,8 @@ def normalize(text: str) -> str:
 
 # Cache for knowledge base lookups
 _kb_cache = {}
+# Where exact_lookup answers came from: l1, snapshot, l2, firestore_hit, firestore_miss
+_tier_stats = Counter()
 _cache_ttl = settings.KB_CACHE_TTL_SECONDS
 _cache_lock = None
 
@@ -29,24 +35,122 @@ def _get_cache_lock():
 def _is_cache_valid(timestamp: float) -> bool:
     return time.time() - timestamp < _cache_ttl
 
+def set_cache_ttl(seconds: float):
+    """Change the cache TTL (raised while cross-process invalidation is live)"""
+    global _cache_ttl
+    _cache_ttl = seconds
+
 def _get_cached_result(key: str):
     """
     Return a tuple (present: bool, result).
     If present is True, result may be a Tuple[kb_id, answer] or None (meaning cached negative result).
     If present is False, there is no valid cache entry.
+
+    Entries past their TTL but within KB_CACHE_STALE_SECONDS are still
+    returned (stale-while-revalidate) and a single background refresh of the
+    key is scheduled, so a live voice turn never waits on Firestore for a key
+    it has seen before.
     """
+    stale = False
     with _get_cache_lock():
+        _access_counts[key] += 1
         if key in _kb_cache:
             result, timestamp = _kb_cache[key]
             if _is_cache_valid(timestamp):
                 return True, result
+            if time.time() - timestamp < _cache_ttl + settings.KB_CACHE_STALE_SECONDS:
+                stale = True
             else:
                 del _kb_cache[key]
+    if stale:
+        _refresh_stats["stale_served"] += 1
+        _schedule_refresh(key)
+        return True, result
     return False, None
 
-def _set_cached_result(key: str, result: Tuple[str, str]):
+# Stale-while-revalidate: per-key access counts, keys being refreshed and
+# a small pool that re-reads them from Firestore off the caller's thread
+_access_counts = Counter()
+_refreshing = set()
+_refresh_stats = Counter()
+_refresh_executor = None
+_refresher_started = False
+
+def _schedule_refresh(key: str, proactive: bool = False):
+    """Re-read one key from Firestore in the background (at most one in flight per key)"""
+    global _refresh_executor
     with _get_cache_lock():
-        _kb_cache[key] = (result, time.time())
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+        if _refresh_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="kb-refresh")
+    _refresh_stats["proactive" if proactive else "on_stale"] += 1
+    _refresh_executor.submit(_refresh_key, key)
+    _ensure_refresher()
+
+def _refresh_key(key: str):
+    try:
+        result = _query_db(key)
+        _set_cached_result(key, result)
+        l2 = get_l2()
+        if l2 is not None:
+            l2.set(key, result)
+        _refresh_stats["refreshed"] += 1
+    except Exception as e:
+        _refresh_stats["failed"] += 1
+        print(f"[kb_service] Background refresh failed for '{key}': {e}")
+    finally:
+        with _get_cache_lock():
+            _refreshing.discard(key)
+
+def _refresh_hot_keys():
+    """Refresh the most-used keys that are close to expiry, then decay the counts"""
+    now = time.time()
+    with _get_cache_lock():
+        hot = [key for key, _ in _access_counts.most_common(settings.KB_CACHE_HOT_KEYS)]
+        due = [
+            key for key in hot
+            if key in _kb_cache and now - _kb_cache[key][1] >= _cache_ttl * settings.KB_CACHE_REFRESH_AHEAD_RATIO
+        ]
+        # Halve every count so "hot" tracks recent traffic, dropping cold keys
+        for key in list(_access_counts):
+            _access_counts[key] //= 2
+            if not _access_counts[key]:
+                del _access_counts[key]
+    for key in due:
+        _schedule_refresh(key, proactive=True)
+
+def _ensure_refresher():
+    """Start the daemon that proactively refreshes hot keys (once per process)"""
+    global _refresher_started
+    if _refresher_started:
+        return
+    with _get_cache_lock():
+        if _refresher_started:
+            return
+        _refresher_started = True
+    import threading
+
+    def _loop():
+        while True:
+            time.sleep(settings.KB_CACHE_REFRESH_INTERVAL_SECONDS)
+            try:
+                _refresh_hot_keys()
+            except Exception as e:
+                print(f"[kb_service] Hot key refresh failed: {e}")
+
+    threading.Thread(target=_loop, name="kb-hot-refresh", daemon=True).start()
+
+def _set_cached_result(key: str, result: Tuple[str, str], ttl: Optional[float] = None):
+    """Cache a result; `ttl` shortens its life below the current cache TTL"""
+    stamp = time.time()
+    if ttl is not None and ttl < _cache_ttl:
+        # Back-date the entry so it expires `ttl` from now (then revalidates)
+        stamp -= _cache_ttl - ttl
+    with _get_cache_lock():
+        _kb_cache[key] = (result, stamp)
 
 COLL = "knowledge_base"
 
@@ -66,24 +170,67 @@ def exact_lookup(question: str) -> Optional[Tuple[str, str]]:
     cached_present, cached_result = _get_cached_result(normalized_question)
     if cached_present:
         # cached_result may be None (negative cache) or a tuple (kb_id, answer)
+        _tier_stats["l1"] += 1
         print(f"[kb_service] Cache hit for '{normalized_question}': {cached_result}")
         return cached_result
     
-    # Cache miss - query database
+    # Cache miss - try the shared mmap snapshot before Firestore. The snapshot
+    # can lag a write: a miss falls through, and a hit is only cached briefly
+    # before it's revalidated against Firestore.
+    result = kb_snapshot.lookup(normalized_question)
+    if result is not None:
+        _tier_stats["snapshot"] += 1
+        _set_cached_result(normalized_question, result, ttl=settings.KB_SNAPSHOT_HIT_TTL_SECONDS)
+        return result
+
+    # Snapshot miss - try the host-wide L2 (positive or negative entries)
+    l2 = get_l2()
+    if l2 is not None:
+        l2_present, l2_result = l2.get(normalized_question, _cache_ttl)
+        if l2_present:
+            _tier_stats["l2"] += 1
+            _set_cached_result(normalized_question, l2_result)
+            return l2_result
+
+    # L2 miss - query database
+    result = _query_db(normalized_question)
+    # Negative results (None) are cached too, to avoid repeated DB queries
+    _tier_stats["firestore_hit" if result else "firestore_miss"] += 1
+    _set_cached_result(normalized_question, result)
+    if l2 is not None:
+        l2.set(normalized_question, result)
+    # Start hot-key tracking once this process actually reads from Firestore
+    _ensure_refresher()
+    if result is None:
+        print(f"[kb_service] No KB match for '{normalized_question}' (DB miss)")
+    return result
+
+def _query_db(normalized_question: str) -> Optional[Tuple[str, str]]:
+    """Authoritative Firestore read for one normalized question"""
     db = get_db()
     docs = db.collection(COLL).where("normalized_question", "==", normalized_question).limit(1).stream()
-    
     for doc in docs:
-        doc_data = doc.to_dict()
-        result = (doc.id, doc_data.get("answer", ""))
-        _set_cached_result(normalized_question, result)
-        return result
-    
-    # Cache negative result (None) to avoid repeated DB queries
-    _set_cached_result(normalized_question, None)
-    print(f"[kb_service] No KB match for '{normalized_question}' (DB miss)")
+        return (doc.id, doc.to_dict().get("answer", ""))
     return None
 
+def cache_tier_stats() -> Dict[str, Any]:
+    """Lookup counts and hit ratios per cache tier"""
+    counts = dict(_tier_stats)
+    total = sum(counts.values())
+    tiers = ("l1", "snapshot", "l2", "firestore_hit", "firestore_miss")
+    return {
+        "lookups": total,
+        "l2_enabled": get_l2() is not None,
+        "refresh": dict(_refresh_stats),
+        "tiers": {
+            tier: {
+                "count": counts.get(tier, 0),
+                "ratio": round(counts.get(tier, 0) / total, 4) if total else 0.0,
+            }
+            for tier in tiers
+        },
+    }
+
 def smart_lookup(question: str) -> Dict[str, Any]:
     """
     Smart lookup that uses exact text matching.
@@ -120,7 +267,7 @@ def smart_lookup(question: str) -> Dict[str, Any]:
 def upsert_supervisor_answer(question_raw: str, answer: str) -> str:
     """
     Add or update a knowledge base entry with supervisor's answer.
-    Invalidates cache for the updated question.
+    Writes the new answer through to the local cache and the shared L2.
     
     Args:
         question_raw: The original question
@@ -141,8 +288,14 @@ def upsert_supervisor_answer(question_raw: str, answer: str) -> str:
             "answer": answer,
             "updated_at": _now()
         })
-        # Invalidate cache for this question so future lookups see the updated answer
-        _invalidate_cache(normalized_question)
+        bump(COLL)
+        kb_snapshot.schedule_export()
+        # Cache the new answer so lookups don't fall through to a snapshot
+        # that still holds the old one
+        _set_cached_result(normalized_question, (kb_id, answer))
+        l2 = get_l2()
+        if l2 is not None:
+            l2.set(normalized_question, (kb_id, answer))
         return kb_id
 
     # No existing entry -> create new one
@@ -157,21 +310,144 @@ def upsert_supervisor_answer(question_raw: str, answer: str) -> str:
         "updated_at": _now()
     }
     doc_ref.set(data)
+    bump(COLL)
+    kb_snapshot.schedule_export()
     # Invalidate any negative cache that might exist for this question and cache the new positive result
     _invalidate_cache(normalized_question)
     _set_cached_result(normalized_question, (doc_ref.id, answer))
+    l2 = get_l2()
+    if l2 is not None:
+        l2.set(normalized_question, (doc_ref.id, answer))
     return doc_ref.id
 
+# Firestore caps `in` filters at 30 values
+_IN_QUERY_LIMIT = 30
+
+def import_knowledge_base_items(items: Iterable[Dict[str, Any]], source: str = "import") -> Dict[str, int]:
+    """
+    Bulk add or update knowledge base entries.
+
+    Entries are normalized in one pass and deduplicated by normalized question
+    (last one wins). Existing entries are found with chunked `in` queries and
+    all writes go through write batches. The cache is refreshed once at the end.
+
+    Args:
+        items: Dicts with `question` (or `question_raw`) and `answer` keys
+        source: Default `source` value for new entries
+
+    Returns:
+        Counts of created, updated, duplicate and invalid entries
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    received = invalid = 0
+    for item in items:
+        received += 1
+        question = (item.get("question") or item.get("question_raw") or "").strip()
+        answer = (item.get("answer") or "").strip()
+        if not question or not answer:
+            invalid += 1
+            continue
+        entries[normalize(question)] = {
+            "question": question,
+            "answer": answer,
+            "source": item.get("source") or source,
+        }
+
+    db = get_db()
+    col = db.collection(COLL)
+    keys = list(entries)
+
+    # Map normalized question -> existing document id
+    existing: Dict[str, str] = {}
+    for i in range(0, len(keys), _IN_QUERY_LIMIT):
+        chunk = keys[i:i + _IN_QUERY_LIMIT]
+        for doc in col.where("normalized_question", "in", chunk).select(["normalized_question"]).stream():
+            existing.setdefault(doc.to_dict()["normalized_question"], doc.id)
+
+    now = _now()
+    results: Dict[str, Tuple[str, str]] = {}
+    batch = db.batch()
+    pending = 0
+    for key, entry in entries.items():
+        kb_id = existing.get(key)
+        if kb_id:
+            batch.update(col.document(kb_id), {"answer": entry["answer"], "updated_at": now})
+        else:
+            doc_ref = col.document()
+            kb_id = doc_ref.id
+            batch.set(doc_ref, {
+                "id": kb_id,
+                "question": entry["question"],
+                "normalized_question": key,
+                "answer": entry["answer"],
+                "source": entry["source"],
+                "created_at": now,
+                "updated_at": now,
+            })
+        results[key] = (kb_id, entry["answer"])
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    if entries:
+        bump(COLL)
+        kb_snapshot.schedule_export()
+
+    _set_cached_results(results)
+    l2 = get_l2()
+    if l2 is not None and results:
+        l2.set_many(results)
+    return {
+        "received": received,
+        "created": len(entries) - len(existing),
+        "updated": len(existing),
+        "duplicates": received - invalid - len(entries),
+        "invalid": invalid,
+    }
+
+def _set_cached_results(results: Dict[str, Tuple[str, str]]):
+    """Replace many cache entries under a single lock acquisition"""
+    stamp = time.time()
+    with _get_cache_lock():
+        for key, result in results.items():
+            _kb_cache[key] = (result, stamp)
+
+def apply_remote_change(key: str, result: Optional[Tuple[str, str]]) -> bool:
+    """
+    Refresh a cached key after another process changed it.
+
+    Only keys this process has cached (positive or negative) are touched, so
+    the cache doesn't grow with every write seen on the feed. Returns True if
+    the key was cached.
+    """
+    l2 = get_l2()
+    if l2 is not None:
+        l2.refresh(key, result)
+    with _get_cache_lock():
+        if key not in _kb_cache:
+            return False
+        _kb_cache[key] = (result, time.time())
+        return True
+
 def _invalidate_cache(key: str):
-    """Invalidate cache entry for a specific key"""
+    """Invalidate cache entry for a specific key (locally and in the shared L2)"""
     with _get_cache_lock():
         _kb_cache.pop(key, None)
+    l2 = get_l2()
+    if l2 is not None:
+        l2.delete(key)
 
 def clear_cache():
     """Clear all cached knowledge base results"""
     with _get_cache_lock():
         _kb_cache.clear()
     normalize.cache_clear()
+    l2 = get_l2()
+    if l2 is not None:
+        l2.clear()
 
 def list_knowledge_base_items(limit: int = 50) -> list:
     """
@@ -187,6 +463,27 @@ def list_knowledge_base_items(limit: int = 50) -> list:
     docs = db.collection(COLL).order_by("created_at", direction="DESCENDING").limit(limit).stream()
     return [doc.to_dict() for doc in docs]
 
+def iter_knowledge_base_items(since: Optional[str] = None, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Stream knowledge base items ordered by updated_at ascending.
+
+    Args:
+        since: Only yield items updated strictly after this ISO timestamp
+        page_size: Documents fetched per Firestore round trip
+
+    Returns:
+        Iterator of knowledge base items
+    """
+    q = get_db().collection(COLL)
+    if since:
+        q = q.where("updated_at", ">", since)
+    q = q.order_by("updated_at", direction="ASCENDING")
+    return stream_paged(q, page_size)
+
+def version_stamp() -> str:
+    """Change stamp used for list ETags"""
+    return collection_stamp(COLL)
+
 def load_index_from_kb():
     """
     Load knowledge base index. This is a no-op for normal search.
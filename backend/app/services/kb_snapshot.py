@@ -0,0 +1,252 @@
+"""
+Compact, memory-mapped knowledge base snapshot.
+
+Layout (little-endian):
+    header   "<4sIII"  magic, version, slot count (power of two), entry count
+    slots    "<QI" * n 64-bit key hash, record offset (0 = empty)
+    records  "<III"    key/id/answer byte lengths, followed by the utf-8 bytes
+
+Keys are `kb_service.normalize`d questions, hashed with blake2b so every
+process agrees on slot positions, and probed linearly. Exactly one process
+per host exports the file: the API process that wins `claim_exporter()`'s
+file lock. It re-exports (debounced, one export at a time) after its own KB
+writes and after writes it sees on the invalidation feed, writing a unique
+tmp file and `os.replace`-ing it. Agent workers only read: they `mmap` it
+read-only, so all processes on a host share one page-cache copy, and pick up
+a replaced file on their next lookup. A corrupt or truncated file reads as a
+miss.
+
+The snapshot needs fcntl (POSIX): there's no exporter lock without it, and
+Windows can't replace a file other processes have mapped, so elsewhere the
+feature is off and lookups go straight to the other tiers.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshot disabled (see module docstring)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"KBS1"
+VERSION = 2
+_HEADER = struct.Struct("<4sIII")
+_SLOT = struct.Struct("<QI")
+_RECORD = struct.Struct("<III")
+# Seconds between stat() calls when checking for a newer snapshot file
+_STAT_INTERVAL = 1.0
+
+
+def _hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def write_snapshot(entries: Dict[str, Tuple[str, str]], path: str) -> int:
+    """Write `{normalized_question: (kb_id, answer)}` to `path`; returns bytes written."""
+    n_slots = 1
+    while n_slots < max(2 * len(entries), 8):
+        n_slots *= 2
+    slots = [(0, 0)] * n_slots
+    records = bytearray()
+    base = _HEADER.size + _SLOT.size * n_slots
+    for key, (kb_id, answer) in entries.items():
+        k, i, a = key.encode(), kb_id.encode(), answer.encode()
+        h = _hash(k)
+        pos = h & (n_slots - 1)
+        while slots[pos][1]:
+            pos = (pos + 1) & (n_slots - 1)
+        slots[pos] = (h, base + len(records))
+        records += _RECORD.pack(len(k), len(i), len(a)) + k + i + a
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, n_slots, len(entries)))
+            for h, offset in slots:
+                f.write(_SLOT.pack(h, offset))
+            f.write(records)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return base + len(records)
+
+
+class KBSnapshot:
+    """Read-only view over a snapshot file."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+        magic, version, self._n_slots, self.entries = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a KB snapshot: {path}")
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        mm, k = self._mm, key.encode()
+        h = _hash(k)
+        mask = self._n_slots - 1
+        pos = h & mask
+        for _ in range(self._n_slots):
+            slot_h, offset = _SLOT.unpack_from(mm, _HEADER.size + pos * _SLOT.size)
+            if not offset:
+                return None
+            if slot_h == h:
+                k_len, i_len, a_len = _RECORD.unpack_from(mm, offset)
+                start = offset + _RECORD.size
+                # mmap slices silently stop at the end of a truncated file
+                if start + k_len + i_len + a_len > len(mm):
+                    raise ValueError("KB snapshot record runs past end of file")
+                if mm[start:start + k_len] == k:
+                    start += k_len
+                    kb_id = mm[start:start + i_len].decode()
+                    return kb_id, mm[start + i_len:start + i_len + a_len].decode()
+            pos = (pos + 1) & mask
+        return None
+
+
+_reader: Optional[KBSnapshot] = None
+_checked_at = 0.0
+_reader_lock = threading.Lock()
+
+
+def reader() -> Optional[KBSnapshot]:
+    """Return the current snapshot, reopening it when the file was replaced."""
+    global _reader, _checked_at
+    path = settings.KB_SNAPSHOT_PATH
+    now = time.monotonic()
+    if not path or fcntl is None or now - _checked_at < _STAT_INTERVAL:
+        return _reader
+    with _reader_lock:
+        if now - _checked_at < _STAT_INTERVAL:
+            return _reader
+        _checked_at = now
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            _reader = None
+            return None
+        if _reader is None or _reader.identity != (st.st_ino, st.st_mtime_ns, st.st_size):
+            try:
+                # The old map is left to the GC so in-flight lookups on other
+                # threads never read from a closed mapping
+                _reader = KBSnapshot(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"KB snapshot open failed: {e}")
+                _reader = None
+    return _reader
+
+
+def lookup(key: str) -> Optional[Tuple[str, str]]:
+    """Look up a normalized question in the snapshot; None if absent, unreadable or no snapshot."""
+    snap = reader()
+    if snap is None:
+        return None
+    try:
+        return snap.get(key)
+    except (struct.error, UnicodeDecodeError, ValueError, IndexError) as e:
+        logger.warning(f"KB snapshot read failed, treating as miss: {e}")
+        return None
+
+
+_export_lock = threading.Lock()
+
+
+def export_snapshot(items: Optional[Iterable[Dict]] = None, path: Optional[str] = None) -> int:
+    """Build a snapshot from the KB (or `items`) and atomically replace the file."""
+    path = path or settings.KB_SNAPSHOT_PATH
+    if items is None:
+        from app.services.kb_service import iter_knowledge_base_items
+        items = iter_knowledge_base_items(page_size=settings.EXPORT_PAGE_SIZE)
+    entries: Dict[str, Tuple[str, str]] = {}
+    for item in items:
+        key = item.get("normalized_question")
+        if key and item.get("answer") is not None:
+            entries[key] = (item.get("id", ""), item["answer"])
+    t0 = time.perf_counter()
+    # One export at a time, so overlapping exports never race on the file
+    with _export_lock:
+        size = write_snapshot(entries, path)
+    logger.info(f"KB snapshot: {len(entries)} entries, {size} bytes in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    return len(entries)
+
+
+_timer: Optional[threading.Timer] = None
+_timer_lock = threading.Lock()
+# Open lock file held by the exporting process (None: this process only reads)
+_exporter_lock_file = None
+
+
+def claim_exporter() -> bool:
+    """
+    Make this process the host's snapshot exporter if no other process is.
+
+    Uses a non-blocking exclusive flock held for the life of the process, so
+    with several uvicorn workers exactly one exports. Without fcntl nobody
+    exports.
+    """
+    global _exporter_lock_file
+    if not settings.KB_SNAPSHOT_PATH or fcntl is None:
+        return False
+    if _exporter_lock_file is not None:
+        return True
+    lock_path = settings.KB_SNAPSHOT_PATH + ".lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    f = open(lock_path, "a")
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _exporter_lock_file = f
+    logger.info(f"KB snapshot exporter for {settings.KB_SNAPSHOT_PATH} (pid {os.getpid()})")
+    return True
+
+
+def is_exporter() -> bool:
+    return _exporter_lock_file is not None
+
+
+def _run_export():
+    global _timer
+    with _timer_lock:
+        _timer = None
+    try:
+        export_snapshot()
+    except Exception as e:
+        logger.warning(f"KB snapshot export failed: {e}")
+
+
+def schedule_export(delay: Optional[float] = None):
+    """
+    Re-export after KB changes; bursts within the delay collapse into one export.
+    No-op outside the exporter process.
+    """
+    global _timer
+    if not settings.KB_SNAPSHOT_PATH or not is_exporter():
+        return
+    with _timer_lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(settings.KB_SNAPSHOT_EXPORT_DELAY_SECONDS if delay is None else delay, _run_export)
+        _timer.daemon = True
+        _timer.start()
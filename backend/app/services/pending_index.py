@@ -0,0 +1,60 @@
+"""
+In-memory index of open escalations by normalized question.
+
+Lets escalation attach a caller to an already-open help request for the same
+question instead of writing a new document (and a new listener). Entries are
+dropped when the request resolves or times out in this process, and expire
+after HELP_REQUEST_TIMEOUT_MIN regardless, so a request closed elsewhere is
+never reused for longer than it could have stayed pending.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.services.kb_service import normalize
+
+
+class PendingIndex:
+    def __init__(self, max_age: float = settings.HELP_REQUEST_TIMEOUT_MIN * 60):
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, Tuple[str, float]] = {}
+        self._key_of: Dict[str, str] = {}
+        self.coalesced = 0
+
+    def find(self, question: str) -> Optional[str]:
+        """Open help_request_id for this question, if one is indexed."""
+        key = normalize(question)
+        with self._lock:
+            entry = self._by_key.get(key)
+            if entry is None:
+                return None
+            help_request_id, created = entry
+            if time.monotonic() - created > self._max_age:
+                del self._by_key[key]
+                self._key_of.pop(help_request_id, None)
+                return None
+            self.coalesced += 1
+            return help_request_id
+
+    def add(self, question: str, help_request_id: str):
+        key = normalize(question)
+        with self._lock:
+            self._by_key[key] = (help_request_id, time.monotonic())
+            self._key_of[help_request_id] = key
+
+    def discard(self, help_request_id: str):
+        """Forget a help request once it's no longer pending."""
+        with self._lock:
+            key = self._key_of.pop(help_request_id, None)
+            if key is not None and self._by_key.get(key, ("",))[0] == help_request_id:
+                del self._by_key[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"open": len(self._by_key), "coalesced": self.coalesced}
+
+
+pending = PendingIndex()
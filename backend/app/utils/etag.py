@@ -0,0 +1,148 @@
+"""
+Cheap version tokens for conditional GETs on list endpoints.
+
+The version is a remote stamp (document count + newest updated_at) read
+from Firestore and then reused until something says it changed, so every
+process derives the same ETag for the same data and an unchanged list is
+answered without touching Firestore. Write paths must set updated_at and
+call `bump`, which drops the cached stamp. Writes from other processes (the
+agent worker, other uvicorn workers) are picked up by a per-collection
+watch on `updated_at` (started with `watch`) that bumps on every change.
+While a collection's watch is live the stamp is re-probed only every
+ETAG_WATCHED_PROBE_TTL_SECONDS, as a fallback for changes the watch can't
+see (deleting a document last updated before the watch started); without a
+live watch it falls back to ETAG_PROBE_TTL_SECONDS.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+_stamps: Dict[str, Tuple[str, float]] = {}
+_watches: Dict[str, Any] = {}
+# Collections `watch` was asked for, reopened by `rewatch`
+_wanted: Set[str] = set()
+
+
+def bump(collection: str):
+    """Record a write to `collection` so the next request re-probes its stamp."""
+    with _lock:
+        _counters[collection] = _counters.get(collection, 0) + 1
+        _stamps.pop(collection, None)
+
+
+def _watched(collection: str) -> bool:
+    watch = _watches.get(collection)
+    return watch is not None and getattr(watch, "is_active", True)
+
+
+def _probe_ttl(collection: str) -> float:
+    if _watched(collection):
+        return settings.ETAG_WATCHED_PROBE_TTL_SECONDS
+    return settings.ETAG_PROBE_TTL_SECONDS
+
+
+def collection_version(collection: str, probe: Callable[[], str]) -> str:
+    """Return the current version token, calling `probe` only when the stamp is stale."""
+    now = time.monotonic()
+    with _lock:
+        counter = _counters.get(collection, 0)
+        cached = _stamps.get(collection)
+    if cached is not None and now - cached[1] < _probe_ttl(collection):
+        stamp = cached[0]
+    else:
+        stamp = probe()
+        with _lock:
+            # Don't cache a stamp that a concurrent write already outdated
+            if _counters.get(collection, 0) == counter:
+                _stamps[collection] = (stamp, now)
+    return f"{collection}:{stamp}"
+
+
+def watch(collections: Iterable[str]):
+    """
+    Bump each collection whenever a document in it changes, from any process.
+
+    Replaces existing watches (e.g. after a database reconnect). A collection
+    whose watch can't be opened keeps the short probe TTL.
+    """
+    from app.repositories.firestore_client import get_db
+    since = datetime.now(timezone.utc).isoformat()
+    for collection in collections:
+        _wanted.add(collection)
+        def _on_snapshot(docs, changes, read_time, collection=collection):
+            if changes:
+                bump(collection)
+        try:
+            new = get_db().collection(collection).where("updated_at", ">=", since).on_snapshot(_on_snapshot)
+        except Exception as e:
+            logger.warning(f"ETag watch unavailable for {collection}, probing every {settings.ETAG_PROBE_TTL_SECONDS}s: {e}")
+            new = None
+        with _lock:
+            old = _watches.pop(collection, None)
+            if new is not None:
+                _watches[collection] = new
+            # Anything written while no watch was open is caught by a re-probe
+            _stamps.pop(collection, None)
+        _unsubscribe(old)
+
+
+def rewatch():
+    """Reopen every watch on the current Firestore client."""
+    watch(sorted(_wanted))
+
+
+def stop_watches():
+    with _lock:
+        watches = list(_watches.values())
+        _watches.clear()
+    for w in watches:
+        _unsubscribe(w)
+
+
+def _unsubscribe(w):
+    if w is None:
+        return
+    try:
+        w.unsubscribe()
+    except Exception as e:
+        logger.warning(f"Failed to unsubscribe ETag watch: {e}")
+
+
+def _strip_weak(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def conditional(request: Request, response: Response, collection: str, probe: Callable[[], str]) -> Optional[Response]:
+    """
+    Set an ETag on `response` for this collection and query string.
+
+    Returns a 304 response when the client's If-None-Match already matches,
+    otherwise None so the caller builds the normal body. If the version probe
+    fails the request is served without an ETag.
+    """
+    try:
+        version = collection_version(collection, probe)
+    except Exception as e:
+        logger.warning(f"ETag probe failed for {collection}: {e}")
+        return None
+    digest = hashlib.sha1(f"{version}|{request.url.query}".encode()).hexdigest()[:20]
+    etag = f'W/"{digest}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {_strip_weak(t.strip()) for t in if_none_match.split(",")}
+        if "*" in tags or _strip_weak(etag) in tags:
+            return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
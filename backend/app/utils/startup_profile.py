@@ -0,0 +1,114 @@
+"""
+Startup profiling: per-module import time and named startup phases.
+
+Enabled with STARTUP_PROFILE=true. `install()` must run before the imports
+being measured (top of app.main / agent_bot); it adds a meta-path finder that
+times each module's execution, so nested imports are counted both in their
+own entry and in their importer's cumulative time. `phase()` times blocks such
+as lifespan steps, and `report()` logs the slowest imports and all phases.
+"""
+
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("startup")
+
+# module name -> [cumulative seconds, self seconds]
+_imports: Dict[str, List[float]] = {}
+_phases: List[Tuple[str, float]] = []
+# Time spent in child imports, one slot per import currently executing
+_child_time: List[float] = []
+_installed_at: Optional[float] = None
+
+
+def enabled() -> bool:
+    # Read straight from the environment: this runs before app.config loads
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv("STARTUP_PROFILE", "false").lower() == "true"
+
+
+def _timed(name: str, exec_module):
+    def exec_and_time(module):
+        _child_time.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            exec_module(module)
+        finally:
+            total = time.perf_counter() - t0
+            children = _child_time.pop()
+            _imports[name] = [total, total - children]
+            if _child_time:
+                _child_time[-1] += total
+    return exec_and_time
+
+
+class _TimingFinder:
+    """Delegates to the remaining finders and wraps the found loader's exec_module."""
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None:
+                continue
+            loader = spec.loader
+            # Builtin/frozen importers are classes shared by every module; only
+            # per-module loader instances can be patched safely
+            if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+                try:
+                    loader.exec_module = _timed(name, loader.exec_module)
+                except AttributeError:
+                    pass
+            return spec
+        return None
+
+
+def install():
+    """Start timing imports if profiling is enabled (idempotent)."""
+    global _installed_at
+    if _installed_at is not None or not enabled():
+        return
+    _installed_at = time.perf_counter()
+    sys.meta_path.insert(0, _TimingFinder())
+
+
+@contextmanager
+def phase(name: str):
+    """Record how long the enclosed block takes."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - t0))
+
+
+def snapshot(top: int = 25) -> Dict[str, object]:
+    slowest = sorted(_imports.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    return {
+        "enabled": _installed_at is not None,
+        "since_install_ms": round((time.perf_counter() - _installed_at) * 1000, 1) if _installed_at else None,
+        "modules_imported": len(_imports),
+        "imports": [
+            {"module": name, "cumulative_ms": round(cum * 1000, 1), "self_ms": round(own * 1000, 1)}
+            for name, (cum, own) in slowest
+        ],
+        "phases": [{"phase": name, "ms": round(secs * 1000, 1)} for name, secs in _phases],
+    }
+
+
+def report(top: int = 25):
+    """Log the slowest imports and every recorded phase (no-op unless enabled)."""
+    if _installed_at is None:
+        return
+    snap = snapshot(top)
+    logger.info(f"Startup profile: {snap['modules_imported']} modules imported, {snap['since_install_ms']} ms since install")
+    for row in snap["imports"]:
+        logger.info(f"  import {row['module']}: {row['cumulative_ms']} ms (self {row['self_ms']} ms)")
+    for row in snap["phases"]:
+        logger.info(f"  phase {row['phase']}: {row['ms']} ms")
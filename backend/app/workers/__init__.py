@@ -2,6 +2,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from app.config import settings
 from app.repositories import help_requests_repo
+from app.services.pending_index import pending
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,13 +22,25 @@ def check_timeouts():
             created_at = datetime.fromisoformat(request["created_at"].replace("Z", "+00:00"))
             if created_at < timeout_threshold:
                 help_requests_repo.mark_unresolved(request["id"])
+                pending.discard(request["id"])
                 logger.info(f"Marked help request {request['id']} as unresolved due to timeout")
                 
     except Exception as e:
         logger.error(f"Error checking timeouts: {e}")
 
+def backfill_normalized_questions():
+    """One-off: let resolution auto-resolve pending requests created before normalized_question existed"""
+    try:
+        updated = help_requests_repo.backfill_normalized_questions()
+        if updated:
+            logger.info(f"Backfilled normalized_question on {updated} pending help requests")
+    except Exception as e:
+        logger.error(f"Error backfilling normalized questions: {e}")
+
 def start():
     """Start the scheduler"""
+    # No trigger: runs once, right after the scheduler starts
+    scheduler.add_job(backfill_normalized_questions, id="normalized_question_backfill", replace_existing=True)
     scheduler.add_job(
         check_timeouts,
         trigger=IntervalTrigger(minutes=1),  # Check every minute
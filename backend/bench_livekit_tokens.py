@@ -0,0 +1,47 @@
+"""
+Benchmark LiveKit token minting throughput.
+
+Compares the bulk minter behind POST /livekit/tokens with one AccessToken per
+caller (the /livekit/token path), when the livekit SDK is installed.
+
+Usage: python bench_livekit_tokens.py [count] [batch_size]
+"""
+
+import sys
+import time
+
+from app.services.livekit_tokens import TokenMinter, default_identities
+
+API_KEY = "bench-key"
+API_SECRET = "bench-secret-0123456789abcdef0123456789abcdef"
+
+
+def bench_bulk(count: int, batch_size: int) -> float:
+    minter = TokenMinter(API_KEY, API_SECRET)
+    identities = default_identities(count)
+    t0 = time.perf_counter()
+    for i in range(0, count, batch_size):
+        minter.mint_many(identities[i:i + batch_size], "bench-room", 3600)
+    return count / (time.perf_counter() - t0)
+
+
+def bench_access_token(count: int) -> float:
+    from livekit.api import AccessToken, VideoGrants
+    t0 = time.perf_counter()
+    for identity in default_identities(count):
+        token = AccessToken(API_KEY, API_SECRET)
+        token.with_identity(identity)
+        token.with_name("Customer")
+        token.with_grants(VideoGrants(room_join=True, room="bench-room", can_publish=True, can_subscribe=True))
+        token.to_jwt()
+    return count / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    print(f"bulk minter (batch={batch_size}): {bench_bulk(count, batch_size):,.0f} tokens/sec")
+    try:
+        print(f"AccessToken per caller:        {bench_access_token(count):,.0f} tokens/sec")
+    except ImportError:
+        print("AccessToken per caller:        skipped (livekit-api not installed)")
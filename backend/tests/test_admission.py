@@ -0,0 +1,98 @@
+import pytest
+
+from app.config import settings
+from app.services import admission, agent_service
+from app.services.admission import AdmissionController, EscalationThrottled, TokenBucket
+
+
+def test_token_bucket_starts_full_and_refills_at_rate():
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    now = bucket.updated
+    assert bucket.take(now)
+    assert bucket.take(now)
+    assert not bucket.take(now)
+    # 0.5 s at 2 tokens/s refills exactly one token
+    assert bucket.take(now + 0.5)
+    assert not bucket.take(now + 0.5)
+
+
+def test_token_bucket_refill_is_capped_at_capacity():
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    now = bucket.updated + 100
+    assert bucket.is_full(now)
+    assert bucket.take(now) and bucket.take(now)
+    assert not bucket.take(now)
+
+
+def test_token_bucket_give_back_returns_one_token_up_to_capacity():
+    bucket = TokenBucket(rate=0.0, capacity=1)
+    now = bucket.updated
+    assert bucket.take(now)
+    bucket.give_back()
+    assert bucket.take(now)
+    bucket.give_back()
+    bucket.give_back()
+    assert bucket.tokens == 1
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    def make(per_customer_burst=1, global_burst=10):
+        monkeypatch.setattr(settings, "ESCALATION_RATE_PER_CUSTOMER_PER_MINUTE", 0.0)
+        monkeypatch.setattr(settings, "ESCALATION_BURST_PER_CUSTOMER", per_customer_burst)
+        monkeypatch.setattr(settings, "ESCALATION_GLOBAL_RATE_PER_SECOND", 0.0)
+        monkeypatch.setattr(settings, "ESCALATION_GLOBAL_BURST", global_burst)
+        return AdmissionController()
+    return make
+
+
+def test_customer_shed_reuses_last_request_only_for_the_same_question(controller):
+    c = controller(per_customer_burst=1)
+    c.admit("cust", "Do you do nails?")
+    c.record("cust", "hr-1", "Do you do nails?")
+
+    with pytest.raises(EscalationThrottled) as same:
+        c.admit("cust", "do you do NAILS")
+    assert same.value.scope == "customer"
+    assert same.value.help_request_id == "hr-1"
+    assert same.value.message == admission.ALREADY_ESCALATED_MESSAGE
+
+    with pytest.raises(EscalationThrottled) as other:
+        c.admit("cust", "Are you open on Sunday?")
+    assert other.value.help_request_id is None
+    assert other.value.message == admission.BUSY_MESSAGE
+    assert c.stats()["shed_customer"] == 2
+
+
+def test_global_shed_of_a_first_escalation_has_no_request(controller):
+    c = controller(per_customer_burst=5, global_burst=1)
+    c.admit("first", "Do you do nails?")
+
+    with pytest.raises(EscalationThrottled) as shed:
+        c.admit("second", "Do you do nails?")
+    assert shed.value.scope == "global"
+    assert shed.value.help_request_id is None
+    assert shed.value.message == admission.BUSY_MESSAGE
+    assert c.stats() == {"admitted": 1, "shed_customer": 0, "shed_global": 1, "tracked_customers": 2}
+
+
+def test_global_shed_does_not_charge_the_customer(controller):
+    c = controller(per_customer_burst=1, global_burst=1)
+    c.admit("first")
+    with pytest.raises(EscalationThrottled):
+        c.admit("second")
+    # "second" got its customer token back, so the global limit sheds it again
+    c._global.give_back()
+    c.admit("second")
+
+
+def test_answer_or_escalate_omits_help_request_id_when_busy(monkeypatch):
+    monkeypatch.setattr(agent_service.kb_service, "exact_lookup", lambda text: None)
+    monkeypatch.setattr(agent_service.pending, "find", lambda text: None)
+
+    def shed(customer_id, text):
+        raise EscalationThrottled("global")
+
+    monkeypatch.setattr(admission, "create_pending", shed)
+    response = agent_service.answer_or_escalate("cust", "Do you do nails?")
+    assert response == {"known": False, "message": admission.BUSY_MESSAGE, "throttled": True}
@@ -0,0 +1,40 @@
+import asyncio
+import gc
+import logging
+
+from app.agent import background
+
+
+def test_spawned_task_is_held_until_done():
+    async def scenario():
+        release = asyncio.Event()
+        finished = []
+
+        async def work():
+            await release.wait()
+            finished.append(True)
+
+        background.spawn(work())
+        gc.collect()
+        held = background.pending()
+        release.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return held, background.pending(), finished
+
+    assert asyncio.run(scenario()) == (1, 0, [True])
+
+
+def test_failures_are_logged(caplog):
+    async def scenario():
+        async def boom():
+            raise RuntimeError("nope")
+
+        task = background.spawn(boom(), name="Test task")
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return task
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(scenario())
+    assert "Test task failed: RuntimeError('nope')" in caplog.text
@@ -0,0 +1,144 @@
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.utils import etag
+
+
+class Probe:
+    def __init__(self, stamp="3:2026-01-01T00:00:00+00:00"):
+        self.stamp = stamp
+        self.error = None
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.stamp
+
+
+class FakeWatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(etag, "_stamps", {})
+    monkeypatch.setattr(etag, "_counters", {})
+    monkeypatch.setattr(etag, "_watches", {})
+    monkeypatch.setattr(etag, "_wanted", set())
+    probe = Probe()
+    app = FastAPI()
+
+    @app.get("/items")
+    def items(request: Request, response: Response):
+        not_modified = etag.conditional(request, response, "items", probe)
+        if not_modified is not None:
+            return not_modified
+        return {"items": []}
+
+    return TestClient(app), probe
+
+
+def test_etag_is_stable_and_probe_is_cached(client):
+    c, probe = client
+    first = c.get("/items")
+    second = c.get("/items")
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["etag"].startswith('W/"')
+    assert probe.calls == 1
+
+
+def test_etag_depends_only_on_stamp_and_query(client, monkeypatch):
+    c, probe = client
+    tag = c.get("/items").headers["etag"]
+    # Another process with other local write counts derives the same tag
+    monkeypatch.setattr(etag, "_counters", {"items": 41})
+    monkeypatch.setattr(etag, "_stamps", {})
+    assert c.get("/items").headers["etag"] == tag
+    assert c.get("/items?status=pending").headers["etag"] != tag
+
+
+def test_matching_if_none_match_returns_304(client):
+    c, _ = client
+    tag = c.get("/items").headers["etag"]
+    for header in (tag, tag[2:], f'"other", {tag}', "*"):
+        resp = c.get("/items", headers={"If-None-Match": header})
+        assert resp.status_code == 304
+        assert resp.headers["etag"] == tag
+        assert resp.content == b""
+    assert c.get("/items", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_bump_reprobes_and_changed_data_gets_a_new_tag(client):
+    c, probe = client
+    tag = c.get("/items").headers["etag"]
+    etag.bump("items")
+    # Bumped but unchanged: same tag, still a 304
+    assert c.get("/items", headers={"If-None-Match": tag}).status_code == 304
+    assert probe.calls == 2
+    probe.stamp = "4:2026-01-02T00:00:00+00:00"
+    etag.bump("items")
+    resp = c.get("/items", headers={"If-None-Match": tag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != tag
+
+
+def test_probe_failure_serves_without_etag(client):
+    c, probe = client
+    probe.error = RuntimeError("firestore down")
+    resp = c.get("/items", headers={"If-None-Match": "*"})
+    assert resp.status_code == 200
+    assert "etag" not in resp.headers
+
+
+def test_watched_collection_uses_long_probe_ttl_and_watch_events_bump(client, monkeypatch):
+    c, probe = client
+    opened = []
+
+    class DB:
+        def collection(self, name):
+            class Query:
+                def where(self, *args):
+                    class Watchable:
+                        def on_snapshot(self, callback):
+                            opened.append(FakeWatch(callback))
+                            return opened[-1]
+                    return Watchable()
+            return Query()
+
+    import app.repositories.firestore_client as firestore_client
+    monkeypatch.setattr(firestore_client, "get_db", lambda: DB())
+    monkeypatch.setattr(settings, "ETAG_PROBE_TTL_SECONDS", 0.0)
+    etag.watch(["items"])
+
+    c.get("/items")
+    c.get("/items")
+    assert probe.calls == 1  # watched: the short TTL doesn't apply
+
+    opened[0].callback([], [], None)  # initial empty snapshot: no change
+    c.get("/items")
+    assert probe.calls == 1
+
+    opened[0].callback([], ["changed"], None)
+    c.get("/items")
+    assert probe.calls == 2
+
+    # A dead watch drops back to the short probe TTL
+    opened[0].is_active = False
+    c.get("/items")
+    assert probe.calls == 3
+
+    etag.rewatch()
+    assert len(opened) == 2
+    assert not opened[0].is_active
+    c.get("/items")
+    c.get("/items")
+    assert probe.calls == 4
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.repositories import help_requests_repo
+from app.routers import help_requests
+
+
+class FakeRepo:
+    """Stands in for the Firestore-backed list queries."""
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+
+    def list_by_status(self, status, limit, fields=None):
+        self.calls.append(("list_by_status", status, fields))
+        return self.items
+
+    def list_help_requests(self, status=None, limit=20, cursor=None, fields=None):
+        self.calls.append(("list_help_requests", status, fields))
+        return {"items": self.items, "next_cursor": None}
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    def make(items):
+        fake = FakeRepo(items)
+        monkeypatch.setattr(help_requests_repo, "list_by_status", fake.list_by_status)
+        monkeypatch.setattr(help_requests_repo, "list_help_requests", fake.list_help_requests)
+        monkeypatch.setattr(help_requests_repo, "version_stamp", lambda: "stamp")
+        app = FastAPI()
+        app.include_router(help_requests.router)
+        return TestClient(app), fake
+    return make
+
+
+def test_projection_is_passed_through_and_only_projected_fields_returned(make_client):
+    client, fake = make_client([{"id": "a", "question": "Do you do nails?", "created_at": "2025-01-01T00:00:00+00:00"}])
+    resp = client.get("/help-requests", params={"status": "pending", "fields": "id,question"})
+    assert resp.status_code == 200
+    assert fake.calls == [("list_by_status", "pending", ["id", "question"])]
+    assert resp.json() == {
+        "items": [{"id": "a", "question": "Do you do nails?", "created_at": "2025-01-01T00:00:00+00:00"}],
+        "next_cursor": None,
+    }
+
+
+def test_unknown_projection_field_is_rejected(make_client):
+    client, fake = make_client([])
+    resp = client.get("/help-requests", params={"fields": "id,password"})
+    assert resp.status_code == 400
+    assert "password" in resp.json()["detail"]
+    assert fake.calls == []
+
+
+def test_timestamp_fields_are_serialized_as_iso_strings(make_client):
+    created = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    client, _ = make_client([{"id": "a", "created_at": created, "status": "pending"}])
+    resp = client.get("/help-requests")
+    assert resp.status_code == 200
+    assert resp.json()["items"] == [{"id": "a", "created_at": created.isoformat(), "status": "pending"}]
+
+
+def test_malformed_document_is_skipped(make_client, caplog):
+    client, _ = make_client([
+        {"id": "bad", "question": {"nested": True}, "seen_by_supervisor": "maybe"},
+        {"id": "good", "question": "Do you do nails?"},
+    ])
+    resp = client.get("/help-requests")
+    assert resp.status_code == 200
+    assert resp.json()["items"] == [{"id": "good", "question": "Do you do nails?"}]
+    assert "'bad'" in caplog.text and "question" in caplog.text
+
+
+def test_page_is_not_revalidated_by_response_model(make_client, monkeypatch):
+    import fastapi.routing
+
+    client, _ = make_client([{"id": "a"}, {"id": "b"}])
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("response_model validated the page again")
+
+    monkeypatch.setattr(fastapi.routing, "serialize_response", fail)
+    resp = client.get("/help-requests")
+    assert resp.status_code == 200
+    assert [item["id"] for item in resp.json()["items"]] == ["a", "b"]
+    assert resp.headers["etag"]
+
+
+def test_project_always_selects_cursor_fields():
+    query = mock.MagicMock()
+    help_requests_repo._project(query, ["question"])
+    query.select.assert_called_once_with(["created_at", "id", "question"])
+    assert help_requests_repo._project(query, None) is query
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+
+from app.config import settings
+from app.services import kb_invalidation, kb_service
+
+
+class FakeWatch:
+    def __init__(self, since, callback):
+        self.since = since
+        self.callback = callback
+        self.is_active = True
+        self.unsubscribed = False
+
+    def unsubscribe(self):
+        self.unsubscribed = True
+        self.is_active = False
+
+
+class FakeDB:
+    """Records every watch opened on `knowledge_base where updated_at >= since`."""
+
+    def __init__(self):
+        self.watches = []
+        self.fail = False
+
+    def collection(self, name):
+        db = self
+
+        class Query:
+            def where(self, field, op, value):
+                assert (field, op) == ("updated_at", ">=")
+
+                class Watchable:
+                    def on_snapshot(self, callback):
+                        if db.fail:
+                            raise RuntimeError("listeners unavailable")
+                        watch = FakeWatch(value, callback)
+                        db.watches.append(watch)
+                        return watch
+                return Watchable()
+        return Query()
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(kb_invalidation, "get_db", lambda: db)
+    monkeypatch.setattr(kb_invalidation.kb_snapshot, "schedule_export", lambda: None)
+    # No monitor thread in tests; check() is called directly
+    monkeypatch.setattr(kb_invalidation.KBInvalidationFeed, "_ensure_monitor", lambda self: None)
+    f = kb_invalidation.KBInvalidationFeed()
+    yield f, db
+    kb_service.set_cache_ttl(settings.KB_CACHE_TTL_SECONDS)
+
+
+def test_start_raises_ttl_and_stop_restores_it(feed):
+    f, db = feed
+    assert f.start()
+    assert kb_service._cache_ttl == settings.KB_CACHE_TTL_WITH_INVALIDATION_SECONDS
+    f.stop()
+    assert db.watches[0].unsubscribed
+    assert kb_service._cache_ttl == settings.KB_CACHE_TTL_SECONDS
+
+
+def test_restart_opens_new_watch_from_last_read_before_closing_old(feed):
+    f, db = feed
+    f.start()
+    old = db.watches[0]
+    read_time = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    old.callback([], [], read_time)
+
+    def unsubscribe():
+        # The replacement watch must already be open
+        assert len(db.watches) == 2
+        old.is_active = False
+
+    old.unsubscribe = unsubscribe
+    assert f.restart()
+    new = db.watches[1]
+    assert new.since == (read_time - kb_invalidation._RESUME_MARGIN).isoformat()
+    assert f._watch is new
+    assert kb_service._cache_ttl == settings.KB_CACHE_TTL_WITH_INVALIDATION_SECONDS
+
+
+def test_restart_without_events_resumes_from_the_old_watch_start(feed):
+    f, db = feed
+    f.start()
+    f.restart()
+    assert db.watches[1].since == db.watches[0].since
+
+
+def test_dead_watch_restores_ttl_and_is_reopened(feed):
+    f, db = feed
+    f.start()
+    db.watches[0].is_active = False
+    db.fail = True
+    f.check()
+    assert not f.running
+    assert kb_service._cache_ttl == settings.KB_CACHE_TTL_SECONDS
+    assert f.counters["watch_lost"] == 1
+
+    db.fail = False
+    f.check()
+    assert f.running
+    assert kb_service._cache_ttl == settings.KB_CACHE_TTL_WITH_INVALIDATION_SECONDS
+
+
+def test_check_does_nothing_after_stop(feed):
+    f, db = feed
+    f.start()
+    f.stop()
+    f.check()
+    assert len(db.watches) == 1
+
+
+def test_events_refresh_cached_keys(feed):
+    f, _ = feed
+    change = mock.Mock()
+    change.type.name = "MODIFIED"
+    change.document.id = "kb-1"
+    change.document.to_dict.return_value = {"normalized_question": "q", "answer": "new"}
+    with mock.patch.object(kb_service, "apply_remote_change", return_value=True) as apply:
+        f._on_snapshot([], [change], datetime.now(timezone.utc) - timedelta(seconds=1))
+    apply.assert_called_once_with("q", ("kb-1", "new"))
+    assert f.counters["refreshed"] == 1
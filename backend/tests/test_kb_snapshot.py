@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from app.config import settings
+from app.services import kb_snapshot
+from app.services.kb_snapshot import KBSnapshot, write_snapshot
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "kb.snap")
+    monkeypatch.setattr(settings, "KB_SNAPSHOT_PATH", path)
+    monkeypatch.setattr(kb_snapshot, "_reader", None)
+    monkeypatch.setattr(kb_snapshot, "_checked_at", 0.0)
+    return path
+
+
+def _round_trip(entries, path):
+    write_snapshot(entries, path)
+    snap = KBSnapshot(path)
+    assert snap.entries == len(entries)
+    return snap
+
+
+def test_empty_snapshot_round_trips(snapshot_path):
+    snap = _round_trip({}, snapshot_path)
+    assert snap.get("anything") is None
+
+
+def test_entries_round_trip_including_unicode(snapshot_path):
+    entries = {f"question {i}": (f"id-{i}", f"answer {i} ✂️") for i in range(100)}
+    entries[""] = ("empty-key", "")
+    snap = _round_trip(entries, snapshot_path)
+    for key, value in entries.items():
+        assert snap.get(key) == value
+    assert snap.get("question 100") is None
+
+
+def test_colliding_hashes_are_probed(snapshot_path, monkeypatch):
+    # Every key hashes to the same slot, so lookups must walk the probe chain
+    monkeypatch.setattr(kb_snapshot, "_hash", lambda key: 42)
+    entries = {f"q{i}": (f"id-{i}", f"a{i}") for i in range(20)}
+    snap = _round_trip(entries, snapshot_path)
+    for key, value in entries.items():
+        assert snap.get(key) == value
+    assert snap.get("missing") is None
+
+
+def test_oversized_key_id_and_answer_round_trip(snapshot_path):
+    key, kb_id, answer = "k" * 70000, "i" * 70000, "a" * 200000
+    snap = _round_trip({key: (kb_id, answer), "short": ("1", "x")}, snapshot_path)
+    assert snap.get(key) == (kb_id, answer)
+    assert snap.get("short") == ("1", "x")
+
+
+def test_other_versions_are_rejected(snapshot_path):
+    with open(snapshot_path, "wb") as f:
+        f.write(kb_snapshot._HEADER.pack(kb_snapshot.MAGIC, kb_snapshot.VERSION - 1, 8, 0))
+        f.write(b"\0" * kb_snapshot._SLOT.size * 8)
+    with pytest.raises(ValueError):
+        KBSnapshot(snapshot_path)
+
+
+@pytest.mark.skipif(kb_snapshot.fcntl is None, reason="snapshot is disabled without fcntl")
+def test_truncated_snapshot_reads_as_a_miss(snapshot_path):
+    write_snapshot({"q": ("1", "a" * 1000)}, snapshot_path)
+    with open(snapshot_path, "r+b") as f:
+        f.truncate(os.path.getsize(snapshot_path) - 500)
+    assert kb_snapshot.lookup("q") is None
+
+
+@pytest.mark.skipif(kb_snapshot.fcntl is None, reason="snapshot is disabled without fcntl")
+def test_export_and_lookup(snapshot_path):
+    count = kb_snapshot.export_snapshot([
+        {"id": "1", "normalized_question": "do you do nails", "answer": "Yes"},
+        {"id": "2", "normalized_question": "no answer", "answer": None},
+    ])
+    assert count == 1
+    assert kb_snapshot.lookup("do you do nails") == ("1", "Yes")
+    assert [name for name in os.listdir(os.path.dirname(snapshot_path)) if name.endswith(".tmp")] == []
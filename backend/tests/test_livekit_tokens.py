@@ -0,0 +1,85 @@
+import base64
+import hashlib
+import hmac
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.routers import livekit
+from app.services import livekit_tokens
+
+API_KEY = "APItestkey"
+API_SECRET = "test-secret-that-is-long-enough-for-hs256"
+
+
+@pytest.fixture
+def credentials(monkeypatch):
+    monkeypatch.setattr(settings, "LIVEKIT_API_KEY", API_KEY)
+    monkeypatch.setattr(settings, "LIVEKIT_API_SECRET", API_SECRET)
+
+
+@pytest.fixture
+def client(credentials):
+    app = FastAPI()
+    app.include_router(livekit.router)
+    return TestClient(app)
+
+
+def _b64decode(part: str) -> bytes:
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def test_minted_token_is_a_valid_hs256_jwt():
+    token = livekit_tokens.TokenMinter(API_KEY, API_SECRET).mint("caller-1", "room-a", 600, now=1000)
+    header, payload, signature = token.split(".")
+    expected = hmac.new(API_SECRET.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    assert _b64decode(signature) == expected
+    assert json.loads(_b64decode(header)) == {"alg": "HS256", "typ": "JWT"}
+    assert json.loads(_b64decode(payload)) == {
+        "iss": API_KEY,
+        "nbf": 1000,
+        "exp": 1600,
+        "name": "Customer",
+        "video": {"roomJoin": True, "room": "room-a", "canPublish": True, "canSubscribe": True},
+        "sub": "caller-1",
+    }
+
+
+def test_minted_tokens_verify_with_livekit():
+    api = pytest.importorskip("livekit.api")
+    identities = ["caller-1", 'caller-"quoted"', "caller-ü"]
+    tokens = livekit_tokens.TokenMinter(API_KEY, API_SECRET).mint_many(identities, "room-a", 600, name="Ann")
+    verifier = api.TokenVerifier(API_KEY, API_SECRET)
+    for identity, token in zip(identities, tokens):
+        claims = verifier.verify(token)
+        assert claims.identity == identity
+        assert claims.name == "Ann"
+        assert claims.video.room == "room-a"
+        assert claims.video.room_join
+        assert claims.video.can_publish
+        assert claims.video.can_subscribe
+
+
+def test_bulk_endpoint_mints_unique_identities(client):
+    resp = client.post("/livekit/tokens", json={"room": "room-a", "count": 3})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["ttl_seconds"] == settings.LIVEKIT_TOKEN_TTL_SECONDS
+    assert len({t["identity"] for t in body["tokens"]}) == 3
+
+
+def test_bulk_endpoint_rejects_count_over_max_batch(client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("identities generated for an oversized count")
+
+    monkeypatch.setattr(livekit_tokens, "default_identities", fail)
+    resp = client.post("/livekit/tokens", json={"count": settings.LIVEKIT_TOKEN_MAX_BATCH + 1})
+    assert resp.status_code == 422
+
+
+def test_bulk_endpoint_rejects_duplicate_identities(client):
+    resp = client.post("/livekit/tokens", json={"identities": ["a", "a"]})
+    assert resp.status_code == 400
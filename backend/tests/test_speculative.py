@@ -0,0 +1,45 @@
+import asyncio
+import gc
+
+from app.agent.speculative import SpeculativeLookup
+
+
+def test_discarded_failed_speculation_is_not_reported_as_unretrieved():
+    async def scenario():
+        errors = []
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda loop, context: errors.append(context["message"]))
+
+        async def failing_lookup(text):
+            raise RuntimeError("firestore down")
+
+        spec = SpeculativeLookup(failing_lookup)
+        spec.on_interim("do you do nails")
+        spec.on_interim("do you do nails")
+        await asyncio.sleep(0)  # let the lookup fail
+        await asyncio.sleep(0)
+        spec.reset()
+        gc.collect()
+        await asyncio.sleep(0)
+        return errors
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_final_transcript_reuses_matching_speculation():
+    async def scenario():
+        calls = []
+
+        async def lookup(text):
+            calls.append(text)
+            return {"found": True, "answer": "Yes"}
+
+        spec = SpeculativeLookup(lookup)
+        spec.on_interim("Do you do nails")
+        spec.on_interim("do you do nails?")
+        result = await spec.resolve("Do you do nails?")
+        return calls, result
+
+    calls, result = asyncio.run(scenario())
+    assert calls == ["do you do nails?"]
+    assert result == {"found": True, "answer": "Yes"}
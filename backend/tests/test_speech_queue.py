@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.agent import speech_queue
+from app.agent.speech_queue import FOLLOWUP, SpeechQueue
+
+
+class Speaker:
+    """Records spoken text; holds the first utterance until released so others queue up."""
+
+    def __init__(self):
+        self.spoken = []
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self, text):
+        self.started.set()
+        await self.release.wait()
+        self.spoken.append(text)
+        return True
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _queue_behind_busy_speaker(**kwargs):
+    speaker = Speaker()
+    queue = SpeechQueue(object(), speaker, **kwargs)
+    first = queue.say("busy")
+    await speaker.started.wait()
+    return queue, speaker, first
+
+
+async def _drain(queue, speaker, *futures):
+    speaker.release.set()
+    results = await asyncio.gather(*futures)
+    await queue.close()
+    return results
+
+
+@pytest.fixture(autouse=True)
+def no_metric_files(monkeypatch):
+    monkeypatch.setattr(settings, "SPEECH_METRICS_DIR", "")
+
+
+def test_followups_are_spoken_before_replies():
+    async def scenario():
+        queue, speaker, first = await _queue_behind_busy_speaker()
+        reply = queue.say("reply", token=1)
+        followup = queue.say("followup", priority=FOLLOWUP)
+        await _drain(queue, speaker, first, reply, followup)
+        return speaker.spoken
+
+    assert run(scenario()) == ["busy", "followup", "reply"]
+
+
+def test_only_utterances_with_the_same_token_merge():
+    async def scenario():
+        queue, speaker, first = await _queue_behind_busy_speaker()
+        a = queue.say("one", token=1)
+        b = queue.say("two", token=1)
+        c = queue.say("three", token=2)
+        assert a is b and b is not c
+        await _drain(queue, speaker, first, a, c)
+        return speaker.spoken
+
+    assert run(scenario()) == ["busy", "one two", "three"]
+
+
+def test_merge_respects_max_chars():
+    async def scenario():
+        queue, speaker, first = await _queue_behind_busy_speaker(merge_max_chars=8)
+        a = queue.say("12345", token=1)
+        b = queue.say("67890", token=1)
+        assert a is not b
+        await _drain(queue, speaker, first, a, b)
+        return speaker.spoken
+
+    assert run(scenario()) == ["busy", "12345", "67890"]
+
+
+def test_cancel_drops_only_that_tokens_unspoken_utterances():
+    async def scenario():
+        queue, speaker, first = await _queue_behind_busy_speaker()
+        old = queue.say("old reply", token=1)
+        new = queue.say("new reply", token=2)
+        assert queue.cancel(1) == 1
+        assert queue.cancel(1) == 0
+        results = await _drain(queue, speaker, first, old, new)
+        return results, speaker.spoken
+
+    results, spoken = run(scenario())
+    assert results == [True, False, True]
+    assert spoken == ["busy", "new reply"]
+
+
+def test_overflow_drops_the_oldest_reply():
+    async def scenario():
+        queue, speaker, first = await _queue_behind_busy_speaker(max_depth=2)
+        r1 = queue.say("r1", token=1)
+        r2 = queue.say("r2", token=2)
+        r3 = queue.say("r3", token=3)
+        results = await _drain(queue, speaker, first, r1, r2, r3)
+        return results, speaker.spoken
+
+    results, spoken = run(scenario())
+    assert results == [True, False, True, True]
+    assert spoken == ["busy", "r2", "r3"]
+
+
+def test_overflow_never_drops_followups():
+    async def scenario():
+        queue, speaker, first = await _queue_behind_busy_speaker(max_depth=2)
+        f1 = queue.say("answer one", priority=FOLLOWUP, token="a")
+        f2 = queue.say("answer two", priority=FOLLOWUP, token="b")
+        rejected = queue.say("reply", token=1)
+        assert rejected.done() and rejected.result() is False
+        # Follow-ups are queued past the limit rather than lost
+        f3 = queue.say("answer three", priority=FOLLOWUP, token="c")
+        results = await _drain(queue, speaker, first, f1, f2, f3)
+        return results, speaker.spoken
+
+    rejected_before = speech_queue.metrics["rejected"]
+    results, spoken = run(scenario())
+    assert results == [True, True, True, True]
+    assert spoken == ["busy", "answer one", "answer two", "answer three"]
+    assert speech_queue.metrics["rejected"] == rejected_before + 1
+
+
+def test_worker_metrics_sums_published_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SPEECH_METRICS_DIR", str(tmp_path))
+    (tmp_path / "speech-1.json").write_text('{"spoken": 3, "wait_ms_total": 300, "max_depth": 2}')
+    (tmp_path / "speech-2.json").write_text('{"spoken": 1, "failed": 1, "wait_ms_total": 30, "max_depth": 4}')
+    (tmp_path / "speech-3.json").write_text("not json")
+    assert speech_queue.worker_metrics() == {
+        "workers": 2, "spoken": 4, "failed": 1, "wait_ms_total": 330, "max_depth": 4, "avg_wait_ms": 66.0,
+    }
+
+
+def test_publish_metrics_writes_this_workers_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SPEECH_METRICS_DIR", str(tmp_path))
+    speech_queue.publish_metrics(force=True)
+    assert speech_queue.worker_metrics()["workers"] == 1